@@ -2,11 +2,11 @@ from enum import Enum
 import random
 from model.board import GameBoard
 from model.bag import Bag
-from model.lexicon import Lexicon
+from model.lexicon import Lexicon, MemoizedLexicon, get_lexicon
 from model.move import Move, Direction
 from model.movevalidator import MoveValidator, MoveValidationError
-from model.config import PASS_LIMIT
-from typing import List
+from model.config import PASS_LIMIT, LEXICON_CACHE_SIZE
+from typing import List, Union
 from model.player import Player
 
 
@@ -20,17 +20,25 @@ class GameState(Enum):
 class GameController:
     """ Represents a game. """
 
-    def __init__(self, players: List[Player], bag: Bag):
+    def __init__(self, players: List[Player], bag: Bag, lexicon: Union[Lexicon, str] = None):
         """
         A class representing a crossword game.
         :param players: A list of players to participate in this game.
         'None' should be used in this List as a placeholder for any player clients yet to join.
+        :param lexicon: Optional. An already loaded lexicon to play with, or the name of a registered one
+        (see model.lexicon.register_lexicon), otherwise the process-wide lexicon for the default word list is used.
         """
         self.players = players
         self.bag = bag
         self.active_player = None
         self.board = GameBoard()
-        self.lexicon = Lexicon()
+        if lexicon is None:
+            lexicon = get_lexicon()
+        elif isinstance(lexicon, str):
+            lexicon = get_lexicon(lexicon)
+        self.lexicon = lexicon
+        if LEXICON_CACHE_SIZE and not isinstance(self.lexicon, MemoizedLexicon):
+            self.lexicon = MemoizedLexicon(self.lexicon, LEXICON_CACHE_SIZE)
         self.validator = MoveValidator(self.lexicon, self.board)
         self.game_state = GameState.PENDING
         self.record_of_moves = {}
@@ -87,13 +95,18 @@ class GameController:
         self.update_players()
         self.game_state = GameState.FIRST_MOVE
 
-        while self.game_state is GameState.FIRST_MOVE:
-            self.wait_for_first_move()
+        try:
+            while self.game_state is GameState.FIRST_MOVE:
+                self.wait_for_first_move()
 
-        while self.game_state is not GameState.ENDED:
-            self.wait_for_move()
+            while self.game_state is not GameState.ENDED:
+                self.wait_for_move()
 
-        self.adjust_final_scores()
+            self.adjust_final_scores()
+        finally:
+            # the game's over (or given up), so the players' worker processes can go:
+            for player in self.players:
+                player.close()
 
     def wait_for_first_move(self):
         move = None
@@ -144,6 +157,12 @@ class GameController:
             self.clean_up_invalid_move(move)
             return
 
+    def cancel_move(self):
+        """ asks the active player to move now, with the best move it has found so far
+        (e.g. from another thread, when a turn has run out of time) """
+        if self.active_player:
+            self.active_player.cancel()
+
     def update_players(self):
         """ notifies players that the view may have changed and
         so they should perform housekeeping """
@@ -1,147 +1,274 @@
-from copy import deepcopy
-from threading import Thread
+from enum import Enum
+import threading
+import time
 
 import numpy as np
 
+from model.endgame import EndgameSolver
+from model.leave import get_leave_table, leave_value, leaves, tiles_left
 from model.move import Move
+from model.movegenerator import MoveGenerator, ParallelMoveGenerator
+from model.preendgame import PreEndgame
 from model.rack import Rack
+from model.simulation import unseen_tiles
 from util.bit_twiddling import read_bit
 
 from controller.game import GameController
-from model.config import Direction, BOARD_SIZE
+from model.config import Direction, EXCHANGE_LIMIT, PRE_ENDGAME_CANDIDATES, PRE_ENDGAME_TILES
 from model.player import Player
 from model.row import Row
 from view.view import View
 from model.movevalidator import MoveValidationError
-import itertools
+
+
+class MoveGeneration(Enum):
+    RECURSIVE = 0  # square by square search from each hook, see play_on_square()
+    ANCHOR = 1  # GADDAG walk from each anchor, see MoveGenerator
+    PARALLEL = 2  # the same walk, with rows spread over a pool of processes, see ParallelMoveGenerator
 
 
 class AiPlayer(Player):
     """ represents a AI-controlled player """
 
-    def __init__(self, game: GameController, gui: View, name: str):
-        """ Create a new AI player """
+    def __init__(self, game: GameController, gui: View, name: str,
+                 generation: MoveGeneration = MoveGeneration.ANCHOR, top_k: int = None, time_budget: float = None,
+                 equity: bool = False, endgame_time: float = None, pre_endgame_time: float = None,
+                 processes: int = 1):
+        """ Create a new AI player
+        :param generation: Optional. How to generate moves (both find exactly the same moves)
+        :param top_k: Optional. Only find this many of the highest scoring placements, rather
+        than every one (see MoveGenerator.best_moves, not used with recursive generation)
+        :param time_budget: Optional. Seconds allowed for each move. The most promising anchors are
+        searched first, and when time's up (or the move is cancelled, see cancel) the best placement
+        found so far is played (see MoveGenerator.best_moves, not used with recursive generation).
+        Without top_k, the PRE_ENDGAME_CANDIDATES highest scoring placements are found, so choosing
+        by equity, or the pre-endgame search, still has a few to choose between
+        :param equity: Optional. Choose moves by their score plus the worth of the tiles they leave on the rack,
+        looked up in the leave table (see model.leave, or leave_value() until a table's built), rather than
+        by score alone
+        :param endgame_time: Optional. Once the bag is empty (in a two player game, so the opponent's tiles
+        are known), search the rest of the game for up to this many seconds, to play the move leaving the player
+        furthest ahead at the end (see EndgameSolver), rather than just the move scoring most now
+        :param pre_endgame_time: Optional. While the bag holds only a few tiles (see PRE_ENDGAME_TILES, in a two
+        player game), spend up to this many seconds playing the best few moves out over every way the unseen tiles
+        could be dealt, to play the move most likely to win (see PreEndgame)
+        :param processes: Optional. Number of processes the pre-endgame search is shared between (1 to search in
+        this one)
+        """
         self.game = game
         self.board = game.board
+        self.generation = generation
+        self.top_k = top_k
+        self.time_budget = time_budget
+        self.equity = equity
+        self.leave_table = get_leave_table() if equity else None
+        self.endgame_time = endgame_time
+        self.endgame_solver = EndgameSolver(game.lexicon, self.board) if endgame_time is not None else None
+        self.pre_endgame_time = pre_endgame_time
+        self.pre_endgame = PreEndgame(game.lexicon, processes) if pre_endgame_time is not None else None
+        # when the current move's time is up, and whether it's been cancelled (which may be from another thread):
+        self.deadline = None
+        self.cancelled = threading.Event()
+        self.move_generator = MoveGenerator(game.lexicon)
+        if top_k or time_budget is not None:
+            # the tables the search's bounds come from are shared by the whole process, but take a
+            # second or so to work out, so that's done now rather than in the time for the first move:
+            self.move_generator.gaddag.heights()
+            self.move_generator.anagram_index.letter_counts()
+        # the pool of worker processes is started once, and kept for the whole game:
+        self.parallel_generator = ParallelMoveGenerator(game.lexicon, self.board) \
+            if generation == MoveGeneration.PARALLEL else None
         super().__init__(game.bag, gui, name)
 
     def get_starting_move(self):
         # return self.get_move()
         # only need to consider one starting row (column would just be a transpose):
-        row = deepcopy(self.board.get_row(8, Direction.HORIZONTAL))
+        row = self.board.get_row(8, Direction.HORIZONTAL)
 
         self.rack.reset_blanks()
-        if '@' in self.rack:
+        # the recursive search needs each blank assigned a letter up front:
+        if '@' in self.rack and self.generation == MoveGeneration.RECURSIVE:
             self.rack.assign_blanks()
-        rack = deepcopy(self.rack)
-        
-        possible_moves = self.play_on_square(row, 8, [None] * 16, rack)
+
+        if self.generation != MoveGeneration.RECURSIVE and (self.top_k or self.time_budget is not None):
+            self.start_clock()
+            possible_moves = self.move_generator.best_moves([row], self.rack.rack_tiles,
+                                                            self.top_k or PRE_ENDGAME_CANDIDATES, self.out_of_time)
+        elif self.generation != MoveGeneration.RECURSIVE:
+            # a single row isn't worth farming out to other processes:
+            possible_moves = self.move_generator.moves_for_row(row, self.rack.rack_tiles)
+        else:
+            possible_moves = self.search_row(row, [8])
 
         if '@' in self.rack:
             self.check_blank_permutations(possible_moves)
 
-        move = self.best_move(possible_moves)
-
-        # reset row so it's a reference to the actual board:
-        if move.row:
-            move.row = self.board.get_row(move.row.rank, move.row.direction)
-
-        return move
-
-        # reset row so it doesn't already contain played tiles:
-        #if move.row:
-        # #   move.row = self.board.get_row(move.row.rank, move.row.direction)
-
-        #return move
+        # moves already refer to the actual board, since generation works on it directly:
+        return self.best_move(possible_moves)
 
     def get_move(self):
+        if self.endgame_solver and not self.game.bag.remaining_tiles() and len(self.game.players) == 2:
+            return self.best_move([self.solve_endgame()])
         possible_moves = self.generate_all_moves()
-        move = self.best_move(possible_moves)
+        if self.pre_endgame and 0 < self.game.bag.remaining_tiles() <= PRE_ENDGAME_TILES \
+                and len(self.game.players) == 2 and len(possible_moves) > 1:
+            return self.best_move([self.solve_pre_endgame(possible_moves)])
+        return self.best_move(possible_moves)
+
+    def solve_endgame(self):
+        """ :return: the move the endgame search finds best, once the bag's empty """
+        self.start_clock()
+        self.rack.reset_blanks()
+        # with the bag empty, the tiles this player can't see are all on the opponent's rack:
+        opponent_tiles = unseen_tiles(self.board, self.rack.rack_tiles)
+        move, value = self.endgame_solver.best_move(self.rack.rack_tiles, opponent_tiles, self.endgame_time,
+                                                    self.cancelled.is_set)
 
-        # reset row so it's a reference to the actual board:
-        if move.row:
-            move.row = self.board.get_row(move.row.rank, move.row.direction)
         return move
 
-    def generate_all_moves(self):
-        """ returns a list of all possible moves """
-        valid_moves = []
-        #row_queue = queue.Queue()
-
-        self.rack.reset_blanks()
+    def close(self):
+        """ stops the worker processes the player keeps for the game """
+        if self.parallel_generator:
+            self.parallel_generator.close()
+        if self.pre_endgame:
+            self.pre_endgame.close()
+
+    def cancel(self):
+        """ stops the search for the current move (with a time budget), so the best found so far is played """
+        self.cancelled.set()
+
+    def solve_pre_endgame(self, possible_moves):
+        """ :return: whichever of the best few of the argument moves is most likely to win (see PreEndgame) """
+        possible_moves.sort(key=self.move_equity if self.equity else (lambda x: x.score), reverse=True)
+        candidates = possible_moves[:PRE_ENDGAME_CANDIDATES]
+        opponent = next(player for player in self.game.players if player is not self)
+        results = self.pre_endgame.evaluate(self.board, self.rack.rack_tiles, self.game.bag.remaining_tiles(),
+                                            candidates, self.score - opponent.score, self.pre_endgame_time,
+                                            self.game.move_number)
+        # most likely to win, then furthest ahead (the first found of the best, if there's a tie):
+        best = max(range(len(candidates)), key=lambda i: results[i])
+
+        return candidates[best]
+
+    def start_clock(self):
+        """ starts the time allowed for a move, and forgets any earlier cancellation """
+        self.cancelled.clear()
+        self.deadline = time.perf_counter() + self.time_budget if self.time_budget is not None else None
+
+    def out_of_time(self):
+        """ :return: True once the current move has been cancelled, or its time is up """
+        return self.cancelled.is_set() or (self.deadline is not None and time.perf_counter() >= self.deadline)
 
-        if '@' in self.rack:
-            self.rack.assign_blanks()
-
-        # grab a list of all the rows which have start squares/hooks in them:
-        rows_to_consider = \
-            [self.board.get_row(i, Direction.HORIZONTAL)
-             for i in range(1, BOARD_SIZE)
-             if self.board.hook_squares[i, :].any()]
-
-        # do the same for columns:
-        rows_to_consider.extend(
-            [self.board.get_row(i, Direction.VERTICAL)
-             for i in range(1, BOARD_SIZE)
-             if self.board.hook_squares[:, i].any()])
-
-        # rows are independent of each other, but share some squares with columns,
-        # so we can consider all rows at once, and all columns too provided we
-        # act on copies of the rows. We can consider each row/column in its own thread:
-
-        # make list of lists of possible moves, each index will be list from a different thread
-        moves = np.full(len(rows_to_consider), None)
-        # to keep track of thread references:
-        row_threads = []
-        # consider each row in separate thread:
-        for i in range(len(rows_to_consider)):
-            row = rows_to_consider[i]
-            thread = Thread(target=self.get_moves_for_row, args=(moves, i, row))
-            row_threads.append(thread)
-            thread.start()
-        # wait for all threads to finish:
-        [t.join() for t in row_threads]
-
-        #    concatenate all move lists from all threads
-        [valid_moves.extend(moves[i]) for i in range(len(rows_to_consider))]
-
-        # now add all combinations of pass and exchange moves by generating all combinations of rack
-        # letters of any length, from 0 tiles up to however many is in the rack:
-        tile_combos = [
-            Move(None, None,list(i)) for i in set([x for l in range(0, len(self.rack))
-                                                   for x in itertools.combinations(self.rack.rack_tiles, l)])
-        ]
-        valid_moves.extend(tile_combos)
+    def generate_all_moves(self):
+        """ returns a list of all possible moves (see iter_moves) """
+        valid_moves = list(self.iter_moves())
 
         # DEBUG:
         # print(str(valid_moves))
 
-        # DEBUG
-        # ("*** moving on ***")
-        # print(threading.get_ident())
-
         if '@' in self.rack:
             self.check_blank_permutations(valid_moves)
 
-        valid_moves = list(set(valid_moves))
-
         return valid_moves
 
-    def get_moves_for_row(self, moves, i, row):
-        """ gets all valid moves playable in the argument row
-        and places them at the given index of the argument list of move lists"""
-        row = deepcopy(row)
-        rack = deepcopy(self.rack)
+    def iter_moves(self):
+        """ generates all possible moves, each as soon as it's found: every placement, then the best
+        exchange if no placement scores anything, then passing. Each move is generated only once,
+        in the same order every time (so ties are settled the same way) """
+        self.start_clock()
+        self.rack.reset_blanks()
 
-        hooks = np.nonzero(row.hook_squares)[0]
-        moves[i] = []
+        # the recursive search needs each blank assigned a letter up front, whereas
+        # the generators try blanks as every letter the lexicon allows:
+        if '@' in self.rack and self.generation == MoveGeneration.RECURSIVE:
+            self.rack.assign_blanks()
 
+        # grab a list of all the rows and columns which have start squares/hooks in them:
+        rows_to_consider = self.board.hooked_rows()
+
+        scored = False
+        for move in self.iter_placements(rows_to_consider):
+            scored = scored or move.score > 0
+            yield move
+
+        # an exchange scores nothing, so on score alone can only beat the best placement if no placement
+        # scores anything either, and then the only exchange worth offering is the one keeping the best
+        # leave (and only if that's better than passing, keeping the whole rack):
+        if not scored or self.equity:
+            exchange = self.best_exchange()
+            if exchange:
+                yield exchange
+        yield Move(None, None, [])  # pass
+
+    def iter_placements(self, rows_to_consider):
+        """ generates all the moves placing tiles in the argument rows """
+        rack_tiles = self.rack.rack_tiles
+        if self.generation != MoveGeneration.RECURSIVE and (self.top_k or self.time_budget is not None):
+            # searched all at once, so the best moves found in one row can cut short the search of others,
+            # and the most promising anchors are searched first in case time runs out:
+            yield from self.move_generator.best_moves(rows_to_consider, rack_tiles,
+                                                      self.top_k or PRE_ENDGAME_CANDIDATES, self.out_of_time)
+        elif self.generation == MoveGeneration.ANCHOR:
+            # the generator leaves the rows untouched, so works straight on the board:
+            yield from self.move_generator.iter_moves(rows_to_consider, rack_tiles)
+        elif self.generation == MoveGeneration.PARALLEL:
+            # the rows are shared out between the processes, so their moves all come back together:
+            yield from self.parallel_generator.moves_for_rows(rows_to_consider, rack_tiles)
+        else:
+            # the search places tiles in the board itself, and takes them back again afterwards,
+            # so rows are searched one at a time (rows share squares with columns). It can reach
+            # the same move more than once, so repeats are skipped:
+            found = set()
+            for row in rows_to_consider:
+                for move in self.search_row(row, np.nonzero(row.hook_squares)[0]):
+                    if move not in found:
+                        found.add(move)
+                        yield move
+
+    def best_exchange(self):
+        """ :return: the exchange move keeping the tiles with the best leave value, or None if
+        no exchange keeps a better leave than passing does, or the bag is too low to exchange """
+        if self.game.bag.remaining_tiles() < EXCHANGE_LIMIT:
+            return None
+        best_value, best_tiles = self.leave_worth(self.rack.rack_tiles), None
+        for kept, exchanged in leaves(self.rack.rack_tiles):
+            if exchanged and len(exchanged) <= self.game.bag.remaining_tiles():
+                value = self.leave_worth(kept)
+                if value > best_value:
+                    best_value, best_tiles = value, exchanged
+        return Move(None, None, best_tiles) if best_tiles else None
+
+    def search_row(self, row, hooks):
+        """ gets all valid moves playable from the given hook squares of the argument row,
+        searching on the board itself: tiles are taken from the player's rack and placed
+        in the row as the search goes, and put back (see play_on_square) as it backtracks """
+        rack_tiles = list(self.rack.rack_tiles)
+        moves = []
         for hook in hooks:
-            moves[i].extend(self.play_on_square(row, hook, [None] * 16, rack))
+            moves.extend(self.play_on_square(row, hook, [None] * 16, self.rack))
+        # tiles go back on the end of the rack, so restore its original order:
+        self.rack.rack_tiles = rack_tiles
+        return moves
+
+    def leave_worth(self, tiles):
+        """ :return: the worth in points of keeping the argument tiles on the rack for the next turn """
+        return self.leave_table.value(tiles) if self.leave_table else leave_value(tiles)
+
+    def rack_leave(self, move):
+        """ :return: list of the tiles the argument move would leave on the rack """
+        return tiles_left(self.rack.rack_tiles, move.tiles)
+
+    def move_equity(self, move):
+        """ :return: the argument move's score, plus the worth of the tiles it leaves on the rack while
+        there are tiles left to draw (once the bag is empty, the game's about to end, and tiles left count
+        against the player rather than for them) """
+        if not self.game.bag.remaining_tiles():
+            return move.score
+        return move.score + self.leave_worth(self.rack_leave(move))
 
     def best_move(self, potential_moves):
 
-        potential_moves.sort(key=lambda x: x.score, reverse=True)
+        potential_moves.sort(key=self.move_equity if self.equity else (lambda x: x.score), reverse=True)
         best_move = potential_moves[0] if potential_moves else Move(None, None, None)
         # now we've decided on a move, remove those tiles from the rack:
         if best_move.tiles:
@@ -168,20 +295,25 @@ class AiPlayer(Player):
             played_tiles[index] = tile
             row.existing_letters[index] = ord(tile)-64
 
-            if row.word_at(index) in self.game.lexicon:
-                new_move = Move(row, np.where(played_tiles)[0][0], [tile for tile in played_tiles if tile])
-                new_move.played_squares = np.where(played_tiles)[0]
+            word = row.word_at(index)
+
+            if word in self.game.lexicon:
+                played_squares = np.where(played_tiles)[0]
+                new_move = Move(row, played_squares[0], [tile for tile in played_tiles if tile], played_squares)
+                # scoring stores the tiles' values in the row, so note what was there to undo it:
+                undo_scores = row.existing_letter_scores[played_squares]
                 new_move.calculate_score()
+                row.existing_letter_scores[played_squares] = undo_scores
                 #DEBUG:
                 #print(self.name+": Considering move: "+str(new_move))
                 valid_moves.append(new_move)
 
             if len(rack) > 0: # if we still have tiles left
                 # try extending into the next square on the left, only if we've made a middle part of a real word:
-                if self.game.lexicon.contains_infix(row.word_at(index)):
+                if self.game.lexicon.contains_infix(word):
                     valid_moves.extend(self.extend_left(index, played_tiles, row, rack))
                 # and if we've made the start of a word yet, try extending that to the right
-                if self.game.lexicon.contains_prefix(row.word_at(index)):
+                if self.game.lexicon.contains_prefix(word):
                     valid_moves.extend(self.extend_right(index, played_tiles, row, rack))
 
             # return the tile to the rack
@@ -3,10 +3,23 @@ from model.config import Direction, BOARD_SIZE, NO_CROSS_WORD
 from model.row import Row
 from util.bit_twiddling import *
 
+# random 64 bit keys for each square (numbered row by row, see GameBoard.square_number) and each value a square
+# of existing_letters can hold (1 to 26 for letters, 33 to 58 for blanks played as letters), which are XORed
+# together for the tiles on the board to give its Zobrist hash. The seed is fixed, so hashes are the same
+# in every process:
+ZOBRIST_SEED = 20170601
+ZOBRIST_KEYS = np.random.default_rng(ZOBRIST_SEED).integers(
+    0, 1 << 64, size=((BOARD_SIZE + 1) ** 2, 64), dtype=np.uint64).tolist()
+
 
 class GameBoard:
     """ Represents a game board. """
 
+    # names of the arrays which together hold the whole state of the board:
+    ARRAYS = ('hook_squares', 'word_multipliers', 'letter_multipliers', 'existing_letters',
+              'existing_letter_scores', 'row_crosschecks', 'row_cross_scores',
+              'column_crosschecks', 'column_cross_scores')
+
     def __init__(self):
         """ creates a new game board """
 
@@ -144,6 +157,75 @@ class GameBoard:
         # in this word that are in same row when playing across a column
         self.column_cross_scores = np.copy(self.row_cross_scores)
 
+        # number of times each line (by direction, then rank) has been changed, so
+        # anything remembered about a line can tell when it's out of date:
+        self.line_changes = np.zeros((2, BOARD_SIZE + 1), dtype=np.int64)
+
+        self.refresh_bitboards()
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        """ returns a game board whose state is held in the given arrays
+        (used as they are, not copied), e.g. views onto memory shared between processes
+
+        :param arrays: dictionary of arrays, by the names in ARRAYS
+        """
+        board = cls.__new__(cls)
+        for name in cls.ARRAYS:
+            setattr(board, name, arrays[name])
+        board.line_changes = np.zeros((2, BOARD_SIZE + 1), dtype=np.int64)
+        board.refresh_bitboards()
+        return board
+
+    def refresh_bitboards(self):
+        """ works out the bitboards and hash of the tiles on the board from scratch. Tiles placed and removed
+        through rows (see Row.place_tiles) keep them up to date as they go, so this is only needed after
+        existing_letters has been changed directly, e.g. by copying another board's into it
+
+        The bitboards are ints with a bit per square (see square_number): occupied has the bits of the squares
+        holding tiles, letter_boards[n] those holding letter n (A=1 to Z=26), whether played as a tile
+        or a blank, and letter_boards[0] those holding blanks. The hash, zobrist, is the XOR of the keys
+        (see ZOBRIST_KEYS) of every tile on the board, so boards with the same tiles have the same hash,
+        whatever order they were played in.
+        """
+        self.occupied = 0
+        self.letter_boards = [0] * 27
+        self.zobrist = 0
+        for square, code in enumerate(self.existing_letters.ravel().tolist()):
+            if code > 0:
+                self.toggle_tile(square, code)
+
+    def toggle_tile(self, square: int, code: int):
+        """ places a tile in the bitboards and hash, or takes it out again (the same thing: both are XORs)
+        :param square: number of the square (see square_number)
+        :param code: the tile, as held in existing_letters
+        """
+        bit = 1 << square
+        self.occupied ^= bit
+        # a blank played as a letter is held 32 above the letter:
+        self.letter_boards[code & 31] ^= bit
+        if code > 26:
+            self.letter_boards[0] ^= bit
+        self.zobrist ^= ZOBRIST_KEYS[square][code]
+
+    @staticmethod
+    def square_number(row: Row, index: int):
+        """ :return: the number of the square at the argument index of the row, counting row by row
+        across the whole board, sentinels included (so the bit for the square in a bitboard) """
+        if row.direction == Direction.HORIZONTAL:
+            return row.rank * (BOARD_SIZE + 1) + index
+        return index * (BOARD_SIZE + 1) + row.rank
+
+    def mark_changed(self, row: Row, squares):
+        """ marks the argument row, and the lines crossing it at the given squares, as changed.
+        Anything changing the board's arrays should call this for the squares it changes
+
+        :param row: the row (or column) changed
+        :param squares: indices in the row of the squares changed
+        """
+        self.line_changes[row.direction.value, row.rank] += 1
+        self.line_changes[1 - row.direction.value, squares] += 1
+
     def get_row(self, rank: int, direction: Direction):
         """returns a given row of the board. This is a copy of the underlying
         game board and any changes to this row object will not be reflected in the board.
@@ -178,7 +260,15 @@ class GameBoard:
         else:
             row_data = None
 
-        return Row(direction, rank, row_data)
+        return Row(direction, rank, row_data, self)
+
+    def hooked_rows(self):
+        """ :return: list of the rows, then the columns (transposed to rows), with hook squares in them,
+        i.e. all the lines a move could be played in """
+        return [self.get_row(rank, Direction.HORIZONTAL) for rank in range(1, BOARD_SIZE)
+                if self.hook_squares[rank, :].any()] + \
+            [self.get_row(rank, Direction.VERTICAL) for rank in range(1, BOARD_SIZE)
+             if self.hook_squares[:, rank].any()]
 
     def __str__(self):
         board = '     ' + ' '.join([chr(64 + x) for x in range(1, BOARD_SIZE)]) + '\n'
@@ -17,6 +17,18 @@ LETTER_DISTRIBUTIONS = [
     1, 2, 1
 ]
 
+# rough worth in points of keeping each tile on the rack for the next turn, starting with blank, then A-Z
+LEAVE_VALUES = [
+    25.0, 1.0, -2.0, 0.5, 0.5, 1.5, -2.0, -2.0,
+    1.0, -0.5, -1.5, -1.0, -0.5, 0.5, 0.5, -1.0,
+    -0.5, -7.0, 1.5, 8.0, 0.0, -3.0, -5.0, -4.0,
+    3.0, -0.5, 3.0
+]
+
+# worth lost for each extra copy of a tile kept, and for each vowel or consonant kept beyond an even split:
+DUPLICATE_PENALTY = 3.0
+IMBALANCE_PENALTY = 2.0
+
 # no of tiles that must be left in the bag to allow exchanging letters
 EXCHANGE_LIMIT = 1
 
@@ -32,6 +44,26 @@ BOARD_SIZE = 16
 # number of tiles in a full rack
 RACK_SIZE = 7
 
+# number of lexicon query results remembered per game (0 to turn the cache off). Off by default: only the
+# recursive move generation asks the lexicon the same things over and over, the other generators walk the GADDAG
+LEXICON_CACHE_SIZE = 0
+
+# number of lines' moves the endgame search remembers (it meets the same lines with the same racks over and over)
+ENDGAME_MOVE_CACHE_SIZE = 65536
+
+# number of positions the endgame search remembers the worth of, in each of its tables
+# (its solver's kept for a whole game, so the oldest are forgotten to make room)
+ENDGAME_TABLE_SIZE = 1 << 18
+
+# most tiles in the bag for an AI player's pre-endgame search, and the number of its best moves it compares
+PRE_ENDGAME_TILES = 6
+PRE_ENDGAME_CANDIDATES = 10
+
+# number of leaves an AI player weighs up after each opponent's move, and how sure it is that the opponent
+# chooses by equity (a leave is e times less likely for every 1 / INFERENCE_RATIONALITY points it makes the move worse)
+INFERENCE_SAMPLES = 4000
+INFERENCE_RATIONALITY = 0.25
+
 # dummy value indicating no running total of cross-word exists yet (can't use zero as could be a blank):
 NO_CROSS_WORD = -1
 
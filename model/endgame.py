@@ -0,0 +1,235 @@
+import time
+
+import numpy as np
+
+from model.board import GameBoard
+from model.config import BOARD_SIZE, Direction, ENDGAME_MOVE_CACHE_SIZE, ENDGAME_TABLE_SIZE, LETTER_VALUES
+from model.leave import tiles_left
+from model.lexicon import Lexicon
+from model.move import Move
+from model.movegenerator import MoveCache, MoveGenerator, SearchStopped
+from model.movevalidator import MoveValidator
+
+# how a transposition table entry's value bounds the true value of its position:
+EXACT, LOWER, UPPER = 0, 1, 2
+
+# depth recorded for positions searched right to the end of the game, which any later search can trust:
+SOLVED = 1 << 16
+
+# what's saved of the board before each move the search makes, to put back afterwards:
+SAVED_ARRAYS = GameBoard.ARRAYS + ('line_changes',)
+
+
+def tiles_value(tiles):
+    """ :return: the total value of the argument tiles (blanks, as '@', are worth nothing) """
+    return sum(LETTER_VALUES[ord(tile) - 64] for tile in tiles if tile != '@')
+
+
+def remember(table: dict, key, value):
+    """ stores the value in the table, forgetting the oldest entry if it's full (see ENDGAME_TABLE_SIZE) """
+    if len(table) >= ENDGAME_TABLE_SIZE and key not in table:
+        del table[next(iter(table))]
+    table[key] = value
+
+
+class EndgameSolver:
+    """ Finds the best move once the bag is empty, when both players' racks are known.
+
+    The game is searched to the end by alpha-beta (negamax, on the difference in the two players'
+    scores), iteratively deepened a move at a time until the whole game's been searched or time's up,
+    when the best move of the deepest search finished is played. Moves are tried best score first,
+    after the best move a previous search found in the same position, which a transposition table
+    keeps (by the board's hash, racks and player to move), with what the position was found to be worth.
+
+    Moves are made on the board itself, and unmade by copying back the board's arrays,
+    saved before the move into buffers kept for each depth, so the search allocates nothing
+    per move beyond the moves generated. """
+
+    def __init__(self, lexicon: Lexicon, board: GameBoard):
+        """ :param lexicon: the lexicon to find moves in
+        :param board: the board to search on, which is left as it was after each search
+        """
+        self.board = board
+        self.generator = MoveGenerator(lexicon)
+        self.validator = MoveValidator(lexicon, board)
+        # a move changes only a few lines, so most of the lines' moves are the same as in the position before:
+        self.move_cache = MoveCache(board, ENDGAME_MOVE_CACHE_SIZE)
+        self.rows = [board.get_row(rank, direction) for direction in (Direction.HORIZONTAL, Direction.VERTICAL)
+                     for rank in range(BOARD_SIZE + 1)]
+        # saved board arrays, one set per depth of the search:
+        self.saved = []
+        self.table = {}
+        # what positions are worth with both players playing their top scoring move (see greedy_value):
+        self.greedy_values = {}
+        # positions searched, and how often the search has had to guess at a position's worth at the depth limit:
+        self.nodes = 0
+        self.horizons = 0
+        self.depth = 0
+        self.solved = False
+        self.deadline = None
+        self.stop = None
+
+    def best_move(self, rack_tiles, opponent_tiles, time_limit: float, stop=None):
+        """ :param rack_tiles: the tiles of the player to move
+        :param opponent_tiles: the tiles on the other player's rack (with the bag empty, the tiles unseen)
+        :param time_limit: seconds to search for
+        :param stop: Optional. Function returning True if the search should stop early
+        :return: the best move found (on the board, ready to play), and what it's worth: how many
+        more points than the opponent it goes on to score, tiles left at the end included (exactly,
+        if solved is set afterwards, otherwise as far as the deepest search finished could see, or
+        as greedy_value has it, if none finished)
+        """
+        self.deadline = time.perf_counter() + time_limit
+        self.stop = stop
+        self.nodes = 0
+        self.solved = False
+        racks = (tuple(sorted(rack_tiles)), tuple(sorted(opponent_tiles)))
+
+        # until the first search finishes, the top scoring move (or a pass, if there's none) is the best known:
+        best = self.top_move(racks[0]) or Move(None, None, [])
+        value = self.greedy_value(racks, 0)
+        depth = 0
+        while not self.solved:
+            depth += 1
+            horizons = self.horizons
+            try:
+                value, best = self.negamax(racks, 0, False, depth, -np.inf, np.inf, 0)
+            except SearchStopped:
+                break
+            self.depth = depth
+            self.solved = self.horizons == horizons
+        return best, value
+
+    def negamax(self, racks, mover: int, passed: bool, depth: int, alpha, beta, ply: int):
+        """ :return: what the position is worth to the player to move: how many more points than
+        the opponent they go on to score (not counting points already scored), with the best move """
+        self.nodes += 1
+        if time.perf_counter() >= self.deadline or (self.stop and self.stop()):
+            raise SearchStopped
+
+        rack, other = racks[mover], racks[1 - mover]
+        key = (self.board.zobrist, racks, mover, passed)
+        entry = self.table.get(key)
+        first = None
+        if entry:
+            entry_depth, entry_value, bound, first = entry
+            # (the position being solved needs its move, so is searched whatever's known of it)
+            if entry_depth >= depth and ply:
+                if entry_depth < SOLVED:
+                    # the value came from a search that stopped short of the end of the game:
+                    self.horizons += 1
+                if bound == EXACT or (bound == LOWER and entry_value >= beta) or \
+                        (bound == UPPER and entry_value <= alpha):
+                    return entry_value, None
+
+        if depth == 0:
+            # guess the game ends here, both players stuck with their tiles:
+            self.horizons += 1
+            return tiles_value(other) - tiles_value(rack), None
+
+        moves = sorted(self.move_cache.moves_for_rows(self.hooked_rows(), rack, self.generate), key=lambda x: x.score,
+                       reverse=True)
+        moves.append(Move(None, None, []))  # pass
+        if first is not None:
+            moves.sort(key=lambda x: str(x) != first)
+
+        horizons = self.horizons
+        original_alpha = alpha
+        best, best_value = None, -np.inf
+        for move in moves:
+            if not move.tiles:
+                if passed:
+                    # both passing in turn ends the game (passing again would change nothing):
+                    value = tiles_value(other) - tiles_value(rack)
+                else:
+                    value = -self.negamax(racks, 1 - mover, True, depth - 1, -beta, -alpha, ply + 1)[0]
+            else:
+                left = tuple(sorted(tiles_left(rack, move.tiles)))
+                if not left:
+                    # playing out wins the value of the opponent's tiles from them:
+                    value = move.score + 2 * tiles_value(other)
+                else:
+                    self.make(move, ply)
+                    try:
+                        next_racks = (left, other) if mover == 0 else (other, left)
+                        value = move.score - self.negamax(next_racks, 1 - mover, False, depth - 1,
+                                                          -beta, -alpha, ply + 1)[0]
+                    finally:
+                        self.unmake(ply)
+            if value > best_value:
+                best, best_value = move, value
+            alpha = max(alpha, value)
+            if alpha >= beta:
+                break
+
+        bound = UPPER if best_value <= original_alpha else LOWER if best_value >= beta else EXACT
+        remember(self.table, key, (depth if self.horizons > horizons else SOLVED, best_value, bound, str(best)))
+        return best_value, best
+
+    def greedy_value(self, racks, mover: int, passed: bool = False, ply: int = 0):
+        """ a fast stand-in for searching: both players play their top scoring move until the game ends
+        :param racks: pair of sorted tuples of the two players' tiles
+        :param mover: which of the racks is to move
+        :param passed: whether the other player passed last
+        :param ply: depth of the moves already made on the board (see make)
+        :return: what the position is worth to the player to move (as for negamax)
+        """
+        key = (self.board.zobrist, racks, mover, passed)
+        value = self.greedy_values.get(key)
+        if value is not None:
+            return value
+
+        rack, other = racks[mover], racks[1 - mover]
+        move = self.top_move(rack)
+        if move is None:
+            value = tiles_value(other) - tiles_value(rack) if passed else \
+                -self.greedy_value(racks, 1 - mover, True, ply + 1)
+        else:
+            left = tuple(sorted(tiles_left(rack, move.tiles)))
+            if not left:
+                value = move.score + 2 * tiles_value(other)
+            else:
+                self.make(move, ply)
+                try:
+                    next_racks = (left, other) if mover == 0 else (other, left)
+                    value = move.score - self.greedy_value(next_racks, 1 - mover, False, ply + 1)
+                finally:
+                    self.unmake(ply)
+        remember(self.greedy_values, key, value)
+        return value
+
+    def top_move(self, rack_tiles):
+        """ :return: the top scoring placement on the board for the argument tiles, or None if there's none """
+        return max(self.move_cache.moves_for_rows(self.hooked_rows(), rack_tiles, self.generate),
+                   key=lambda x: x.score, default=None)
+
+    def hooked_rows(self):
+        """ :return: the rows with hook squares in them, as GameBoard.hooked_rows, but from the rows kept
+        for the search rather than new ones each time """
+        return [row for row in self.rows if row.hook_squares.any()]
+
+    def generate(self, rows, rack_tiles):
+        return list(self.generator.iter_moves(rows, rack_tiles))
+
+    def make(self, move: Move, ply: int):
+        """ plays the argument move on the board, saving the board's arrays first """
+        while len(self.saved) <= ply:
+            self.saved.append({name: getattr(self.board, name).copy() for name in SAVED_ARRAYS})
+        saved = self.saved[ply]
+        for name in SAVED_ARRAYS:
+            np.copyto(saved[name], getattr(self.board, name))
+        saved['bitboards'] = (self.board.occupied, list(self.board.letter_boards), self.board.zobrist)
+
+        move.row.place_tiles(move.played_squares, move.tiles)
+        np.put(move.row.existing_letter_scores, move.played_squares,
+               [LETTER_VALUES[ord(t) - 64] if t.isupper() else 0 for t in move.tiles])
+        self.validator.update_affected_squares(move)
+
+    def unmake(self, ply: int):
+        """ puts the board back as it was before the last move made at the argument depth """
+        saved = self.saved[ply]
+        for name in GameBoard.ARRAYS:
+            np.copyto(getattr(self.board, name), saved[name])
+        self.board.occupied, self.board.letter_boards, self.board.zobrist = saved['bitboards']
+        # the lines the move changed have changed back again:
+        self.board.line_changes[self.board.line_changes != saved['line_changes']] += 1
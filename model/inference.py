@@ -0,0 +1,116 @@
+from itertools import combinations
+import random
+
+import numpy as np
+
+from model.board import GameBoard
+from model.config import BONUS, Direction, EXCHANGE_LIMIT, INFERENCE_RATIONALITY, INFERENCE_SAMPLES, LETTER_VALUES, \
+    RACK_SIZE
+from model.leave import LeaveTable, leave_values, tile_ordinal
+from model.lexicon import Lexicon
+from model.move import Move
+from model.simulation import deal, unseen_tiles
+
+
+class RackInference:
+    """ Works out what the opponent is likely to have kept on their rack, from the move they've just made.
+
+    Leaves the opponent could have kept are drawn at random from the tiles the player can't see (so as
+    likely as the tiles were to have been dealt to the opponent), and each is weighted by how sensible
+    the move would have been, had the opponent held it with the tiles played: a leave which would have made
+    exchanging for a better leave worth more than the move made is less likely, by a factor of e for every
+    1 / rationality points it falls short (the opponent's taken to choose by equity, see AiPlayer.move_equity).
+
+    Other placements are weighed against the move too, as far as they can be without searching the board
+    for each rack (a move generation per rack takes tens of milliseconds, too slow for the thousands of racks
+    weighed each turn): a rack whose tiles spell a word could have played them all for the bonus, scoring at
+    least that and the face value of the tiles, which is taken to be the rack's best placement (so there's
+    taken to have been room for it on the board). Racks which couldn't, are taken to have had nothing better.
+
+    The leaves are all worked on at once, as arrays of tile ordinals, a leave to a row, so thousands
+    can be weighed between turns. Until the opponent's next move, the weighted leaves are the
+    opponent's rack, less whichever tiles they drew to fill it back up (see sample_rack). """
+
+    def __init__(self, leave_table: LeaveTable = None, samples: int = INFERENCE_SAMPLES,
+                 rationality: float = INFERENCE_RATIONALITY, seed: int = 0, lexicon: Lexicon = None):
+        """ :param leave_table: Optional. The leave worths the opponent's taken to play by (default: leave_value())
+        :param samples: Optional. Number of leaves drawn and weighed after each move
+        :param rationality: Optional. How sure to be that the opponent chooses by equity (0 to learn nothing
+        from the move but which tiles are unseen)
+        :param seed: Optional. Seed for the leaves drawn
+        :param lexicon: Optional. The lexicon, to tell which racks could have played all their tiles
+        (without it, placements aren't weighed against the move)
+        """
+        self.leave_table = leave_table
+        self.lexicon = lexicon
+        self.samples = samples
+        self.rationality = rationality
+        self.rng = np.random.default_rng(seed)
+        # the distinct leaves drawn (as strings of tiles, the blank as '@'), and the chance of each:
+        self.leaves = []
+        self.weights = []
+
+    def worths(self, ordinals: np.ndarray):
+        """ :return: array of the worths of the leaves in the rows of the argument array of sorted ordinals """
+        return self.leave_table.values_of(ordinals) if self.leave_table else leave_values(ordinals)
+
+    def observe(self, board: GameBoard, rack_tiles, move: Move, bag_size: int):
+        """ weighs up the opponent's possible leaves after their move
+        :param board: the board, with the opponent's move on it
+        :param rack_tiles: the tiles on the player's rack
+        :param move: the opponent's move (of an exchange, only the number of tiles is looked at)
+        :param bag_size: the number of tiles in the bag, once the opponent has drawn after their move
+        """
+        played = len(move.tiles) if move.tiles else 0
+        if not played:
+            return  # a pass says nothing new about the rack
+        if not bag_size:
+            # the opponent's rack is known, or close to it, so there's nothing to infer:
+            self.leaves, self.weights = [], []
+            return
+
+        unseen = np.array([tile_ordinal(tile) for tile in unseen_tiles(board, rack_tiles)], dtype='int64')
+        size = RACK_SIZE - played
+        # a leave as likely as the opponent was to be dealt it: the first tiles of a random shuffle of the unseen
+        keys = self.rng.random((self.samples, len(unseen)))
+        leaves = np.sort(unseen[np.argsort(keys, axis=1)[:, :size]], axis=1)
+
+        if move.direction == Direction.NOT_APPLICABLE:
+            # an exchange keeps the best leave the opponent could, so the best leaves are likeliest:
+            shortfall = self.worths(leaves) - self.worths(leaves).max()
+        else:
+            racks = np.sort(np.hstack([leaves, np.tile([tile_ordinal(tile) for tile in move.tiles],
+                                                       (self.samples, 1))]), axis=1)
+            equity = move.score + self.worths(leaves)
+            # the best of passing (keeping all seven) and exchanging as many tiles as the bag allowed:
+            best_exchange = equity
+            for kept in range(RACK_SIZE, -1, -1):
+                if kept < RACK_SIZE and (bag_size + played < max(EXCHANGE_LIMIT, RACK_SIZE - kept)):
+                    break
+                for squares in combinations(range(RACK_SIZE), kept):
+                    best_exchange = np.maximum(best_exchange, self.worths(racks[:, list(squares)]))
+            best_alternative = best_exchange
+            if self.lexicon is not None and played < RACK_SIZE:
+                # each different rack is looked up once, and playing all its tiles, if it can, keeps nothing:
+                distinct_racks, rack_numbers = np.unique(racks, axis=0, return_inverse=True)
+                bonus_scores = np.where(self.lexicon.anagram_index.spell_words(distinct_racks),
+                                        BONUS + np.array(LETTER_VALUES)[distinct_racks].sum(axis=1), -np.inf)
+                best_alternative = np.maximum(best_alternative, bonus_scores[rack_numbers.ravel()])
+            shortfall = equity - best_alternative
+
+        distinct, inverse = np.unique(leaves, axis=0, return_inverse=True)
+        weights = np.bincount(inverse.ravel(), weights=np.exp(self.rationality * shortfall))
+        self.leaves = [''.join('@' if ordinal == 0 else chr(64 + ordinal) for ordinal in leave)
+                       for leave in distinct.tolist()]
+        self.weights = (weights / weights.sum()).tolist()
+
+    def distribution(self):
+        """ :return: list of the leaves the opponent's likely to have kept (as strings of tiles, the blank as '@'),
+        with the chance of each, likeliest first, or an empty list if nothing's been inferred """
+        return sorted(zip(self.leaves, self.weights), key=lambda leave: -leave[1])
+
+    def sample_rack(self, rng: random.Random, unseen, rack_size: int = RACK_SIZE):
+        """ deals the opponent a rack, a leave chosen by its chance, filled up at random (see simulation.deal)
+        :return: list of the tiles on the opponent's rack, and list of the rest of the unseen tiles, shuffled
+        """
+        return deal(rng, unseen, self.leaves, self.weights, rack_size)
@@ -0,0 +1,179 @@
+from itertools import chain, combinations
+from math import comb
+import os
+import threading
+
+import numpy as np
+
+from model.config import DUPLICATE_PENALTY, IMBALANCE_PENALTY, LEAVE_VALUES, RACK_SIZE
+from model.lexicon import ROOT_DIR
+
+VOWELS = 'AEIOU'
+
+# kinds of tile a leave can hold: the blank, then A-Z
+TILE_KINDS = 27
+
+# binomial coefficients, BINOMIALS[n][k], for numbering leaves (see leave_index):
+BINOMIALS = [[comb(n, k) for k in range(RACK_SIZE + 1)] for n in range(TILE_KINDS + RACK_SIZE)]
+
+# number of the first leave of each size, leaves being numbered smallest first:
+SIZE_OFFSETS = [0] + [comb(TILE_KINDS - 1 + size, size - 1) for size in range(1, RACK_SIZE + 2)]
+
+# the leave table played with by default, built by util.build_leaves (not shipped, so
+# until it's built, leaves are valued with leave_value instead):
+DEFAULT_LEAVE_FILE = 'leaves.npy'
+
+
+def tile_ordinal(tile: str):
+    """ :return: the ordinal of the argument tile's letter (A=1 to Z=26), or 0 for a blank,
+    whether unassigned ('@') or assigned a letter (lowercase) """
+    return 0 if tile == '@' or tile.islower() else ord(tile) - 64
+
+
+def leave_value(tiles):
+    """ :param tiles: the tiles kept on the rack after a move (blanks as '@' or lowercase letters)
+    :return: rough worth in points of keeping these tiles for the next turn: the worth of each tile,
+    less a penalty for duplicated tiles, and for too many vowels or consonants """
+    ordinals = [tile_ordinal(tile) for tile in tiles]
+    value = sum(LEAVE_VALUES[ordinal] for ordinal in ordinals)
+    value -= DUPLICATE_PENALTY * (len(ordinals) - len(set(ordinals)))
+    vowels = sum(ordinal > 0 and chr(64 + ordinal) in VOWELS for ordinal in ordinals)
+    consonants = sum(ordinal > 0 for ordinal in ordinals) - vowels
+    value -= IMBALANCE_PENALTY * max(abs(vowels - consonants) - 1, 0)
+    return value
+
+
+def tiles_left(rack_tiles, played_tiles):
+    """ :return: list of the rack's tiles left after playing (or exchanging) the argument tiles, where
+    a blank played as a letter (lowercase) comes off the rack as '@', unless it was assigned that letter """
+    leave = list(rack_tiles)
+    for tile in played_tiles or []:
+        leave.remove(tile if tile in leave or tile.isupper() else '@')
+    return leave
+
+
+def leave_index(tiles):
+    """ :param tiles: up to a full rack of tiles (blanks as '@' or lowercase letters)
+    :return: the number of the leave in a LeaveTable. Each distinct set of tiles has its own number,
+    found in a step per tile: the sorted ordinals, made strictly increasing by adding their positions,
+    are a combination, numbered by its rank in colex order (see Knuth, TAOCP 7.2.1.3) """
+    ordinals = sorted([tile_ordinal(tile) for tile in tiles])
+    index = SIZE_OFFSETS[len(ordinals)]
+    for i, ordinal in enumerate(ordinals):
+        index += BINOMIALS[ordinal + i][i + 1]
+    return index
+
+
+def all_leaves(size: int):
+    """ :return: array of the ordinals (in ascending order) of the tiles in every leave of the argument size,
+    a leave to a row, and array of the leaves' numbers (see leave_index) """
+    combinations_count = comb(TILE_KINDS - 1 + size, size)
+    increasing = np.fromiter(chain.from_iterable(combinations(range(TILE_KINDS - 1 + size), size)),
+                             dtype='int64', count=combinations_count * size).reshape(combinations_count, size)
+    binomials = np.array(BINOMIALS, dtype='int64')
+    indexes = SIZE_OFFSETS[size] + binomials[increasing, np.arange(1, size + 1)].sum(axis=1)
+    return increasing - np.arange(size), indexes
+
+
+def leave_indexes(ordinals: np.ndarray):
+    """ :param ordinals: array of the ordinals of the tiles in leaves of the same size, in ascending order,
+    a leave to a row
+    :return: array of the leaves' numbers (as leave_index, for many leaves at once) """
+    size = ordinals.shape[1]
+    binomials = np.array(BINOMIALS, dtype='int64')
+    return SIZE_OFFSETS[size] + binomials[ordinals + np.arange(size), np.arange(1, size + 1)].sum(axis=1)
+
+
+def leave_values(ordinals: np.ndarray):
+    """ :param ordinals: array of the ordinals of the tiles in leaves of the same size, in ascending order,
+    a leave to a row
+    :return: array of the leaves' leave_value() (for many leaves at once) """
+    leave_worths = np.array(LEAVE_VALUES, dtype='float32')
+    vowels = np.zeros(TILE_KINDS, dtype=bool)
+    vowels[[ord(vowel) - 64 for vowel in VOWELS]] = True
+    # with the tiles in order, duplicates are next to each other:
+    duplicates = (ordinals[:, 1:] == ordinals[:, :-1]).sum(axis=1)
+    vowel_count = vowels[ordinals].sum(axis=1)
+    consonant_count = (ordinals > 0).sum(axis=1) - vowel_count
+    return leave_worths[ordinals].sum(axis=1) - DUPLICATE_PENALTY * duplicates \
+        - IMBALANCE_PENALTY * np.maximum(np.abs(vowel_count - consonant_count) - 1, 0)
+
+
+class LeaveTable:
+    """ The worth in points of every possible leave, from no tiles up to a full rack, held in
+    an array indexed by leave number (see leave_index), so looking one up takes a step per tile.
+    Saved as a .npy file of half precision floats (10MB), which is mapped into memory when loaded
+    rather than read, so processes using the same table share one copy of it. """
+
+    def __init__(self, values: np.ndarray):
+        self.values = values
+
+    @classmethod
+    def from_leave_values(cls):
+        """ :return: a table holding leave_value() for every leave (a few seconds to work out) """
+        values = np.zeros(SIZE_OFFSETS[RACK_SIZE + 1], dtype='float32')
+        for size in range(1, RACK_SIZE + 1):
+            ordinals, indexes = all_leaves(size)
+            values[indexes] = leave_values(ordinals)
+        return cls(values)
+
+    @classmethod
+    def load(cls, path: str):
+        """ :return: the table saved in the argument file, mapped read-only into memory """
+        values = np.load(path, mmap_mode='r')
+        if values.shape != (SIZE_OFFSETS[RACK_SIZE + 1],):
+            raise ValueError("Not a leave table: " + path)
+        return cls(values)
+
+    def save(self, path: str):
+        with open(path, 'wb') as table_file:
+            np.save(table_file, self.values.astype('float16'))
+
+    def value(self, tiles):
+        """ :param tiles: the tiles kept on the rack after a move (blanks as '@' or lowercase letters)
+        :return: the worth in points of keeping these tiles for the next turn """
+        return float(self.values[leave_index(tiles)])
+
+    def values_of(self, ordinals: np.ndarray):
+        """ :param ordinals: array of the ordinals of the tiles in leaves of the same size, in ascending order,
+        a leave to a row
+        :return: array of the leaves' worths """
+        return np.asarray(self.values[leave_indexes(ordinals)], dtype='float32')
+
+
+# process-wide leave tables, by path:
+shared_leave_tables = {}
+shared_leave_tables_lock = threading.Lock()
+
+
+def get_leave_table(path: str = None):
+    """ Returns the process-wide leave table in the argument file (defaults to leaves.npy),
+    loading it the first time it's asked for, or None if there's no such file """
+    path = os.path.abspath(os.path.join(ROOT_DIR, path or DEFAULT_LEAVE_FILE))
+    with shared_leave_tables_lock:
+        if path not in shared_leave_tables:
+            shared_leave_tables[path] = LeaveTable.load(path) if os.path.exists(path) else None
+        return shared_leave_tables[path]
+
+
+def leaves(tiles):
+    """ Generates every distinct way of keeping some of the argument tiles and exchanging
+    the rest, without repeats for duplicated tiles (so a rack of AAEE gives 9, not 16)
+
+    :param tiles: list of tiles on the rack
+    :return: generator of (kept, exchanged) pairs of lists of tiles
+    """
+    counts = {}
+    for tile in tiles:
+        counts[tile] = counts.get(tile, 0) + 1
+    distinct = list(counts)
+
+    def split(i, kept, exchanged):
+        if i == len(distinct):
+            yield kept, exchanged
+            return
+        tile = distinct[i]
+        for keep in range(counts[tile], -1, -1):
+            yield from split(i + 1, kept + [tile] * keep, exchanged + [tile] * (counts[tile] - keep))
+
+    return split(0, [], [])
@@ -1,6 +1,365 @@
+from collections import OrderedDict
 from dawg import CompletionDAWG
+from itertools import combinations_with_replacement
+from threading import Lock
+import hashlib
+import mmap
+import numpy as np
 import os
-import sys
+import struct
+
+# identifies a file of prebuilt lexicon indexes (or a lexicon file, which also holds the word list):
+INDEX_MAGIC = b'ALXI'
+
+# bump this whenever the contents or layout of the index file change,
+# so that stale files are rebuilt rather than misread:
+INDEX_VERSION = 5
+
+# magic, version, sha1 digest of the word list, number of sections:
+INDEX_HEADER = struct.Struct('<4sH20sH')
+
+# length and numpy dtype of each section:
+SECTION_HEADER = struct.Struct('<Q8s')
+
+# sections start on this boundary so their arrays can be mapped straight from the file:
+SECTION_ALIGNMENT = 8
+
+# index of the section holding the word list itself, in files which include it:
+WORD_LIST_SECTION = 5
+
+# extension of a file holding a word list along with all its indexes:
+LEXICON_EXTENSION = '.lex'
+
+# word lists are looked for relative to the repository root, whatever the entry point:
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_LEXICON = 'CSW'
+DEFAULT_LEXICON_FILE = 'csw.dawg'
+
+# word lists which can be selected by name, see register_lexicon():
+registered_lexicons = {DEFAULT_LEXICON: DEFAULT_LEXICON_FILE}
+
+# lexicons already loaded in this process, by word list path:
+shared_lexicons = {}
+shared_lexicons_lock = Lock()
+
+
+def minimal_automaton(keys):
+    """ Builds the minimal automaton (a DAWG) accepting exactly the argument keys, by Daciuk et al's
+    incremental algorithm: keys are added in sorted order, and once a key is added, the states along
+    the previous key which it doesn't share can no longer change, so each is merged with an equivalent
+    state already built (one with the same edges), or kept as a new state.
+    No key may be a prefix of another (end each with a character no key has anywhere else), so a state
+    is the end of a key exactly when it has no edges.
+    :param keys: sorted list of strings
+    :return: lists of the source state, label (character ordinal less 64) and target state of every edge,
+    with the root as state 0
+    """
+    states = {}
+    sources, labels, targets = [], [], []
+    # the edges of each state along the last key added, from the root: the last edge of
+    # each leads to the next state along, which isn't finished until another key leaves it:
+    path = [[]]
+    previous = ''
+
+    def finish(depth):
+        while len(path) > depth + 1:
+            edges = tuple(path.pop())
+            state = states.get(edges)
+            if state is None:
+                state = states[edges] = len(states) + 1
+                for label, target in edges:
+                    sources.append(state)
+                    labels.append(label)
+                    targets.append(target)
+            path[-1][-1] = (path[-1][-1][0], state)
+
+    for key in keys:
+        common = 0
+        length = min(len(key), len(previous))
+        while common < length and key[common] == previous[common]:
+            common += 1
+        finish(common)
+        for character in key[common:]:
+            path[-1].append((ord(character) - 64, None))
+            path.append([])
+        previous = key
+    finish(0)
+    for label, target in path[0]:
+        sources.append(0)
+        labels.append(label)
+        targets.append(target)
+    return sources, labels, targets
+
+
+class Gaddag:
+    """ A GADDAG of the lexicon: a graph in which every word can be
+    traced outwards in both directions from any one of its letters.
+    See <a href = https://en.wikipedia.org/wiki/GADDAG>
+
+    Each word is stored once per letter, as the letters up to and including
+    that one in reverse order, then SEPARATOR, then the rest of the word, e.g.
+    CAT is stored as C^AT, AC^T and TAC^ (with '^' standing for SEPARATOR).
+    So from an anchor square a word is grown leftwards by walking the reversed
+    letters, then crossing SEPARATOR to grow it rightwards, in one traversal.
+
+    Nodes are plain integers, and edges are labelled with letter ordinals
+    (A=1, B=2, etc, as on the game board). Each node has a uint32 bitmask of
+    its outgoing edges laid out like the board's crosscheck bitmasks, with bit 0
+    flagging that a word ends at this node. """
+
+    ROOT = 0
+
+    # bit flagging a node at which a word ends:
+    TERMINAL = 0
+
+    # edge label for switching from growing leftwards to growing rightwards:
+    SEPARATOR = 27
+
+    # bitmask of the edges labelled with letters A to Z:
+    LETTERS = ((1 << 27) - 1) & ~1
+
+    def __init__(self, masks: np.ndarray, offsets: np.ndarray, targets: np.ndarray):
+        """ Creates a GADDAG from its flattened arrays: the edge bitmask and
+        index of the first outgoing edge for every node, and the target node of every edge
+        (edges are sorted by node, and by label within each node) """
+        self.arrays = (masks, offsets, targets)
+        # memoryviews index to plain ints much faster than numpy arrays do:
+        self.masks = memoryview(masks)
+        self.offsets = memoryview(offsets)
+        self.targets = memoryview(targets)
+        # worked out when first needed (see heights):
+        self.node_heights = None
+
+    @classmethod
+    def from_words(cls, words):
+        """ Builds a GADDAG holding the argument list of (uppercase) words """
+        keys = sorted([word[:i][::-1] + chr(64 + cls.SEPARATOR) + word[i:] + chr(64 + cls.TERMINAL)
+                       for word in words for i in range(1, len(word) + 1)])
+
+        # minimise the graph of the keys, then flatten its edges into our own arrays:
+        sources, labels, destinations = [np.array(edges, dtype='int64') for edges in minimal_automaton(keys)]
+
+        # edges labelled TERMINAL just mark their source node as the end of a word:
+        ends = sources[labels == cls.TERMINAL]
+        edges = labels != cls.TERMINAL
+        sources, labels, destinations = sources[edges], labels[edges], destinations[edges]
+
+        # renumber states densely, keeping the root as node 0:
+        states = np.unique(np.concatenate(([0], sources, destinations)))
+        sources = np.searchsorted(states, sources)
+        destinations = np.searchsorted(states, destinations)
+        ends = np.searchsorted(states, ends)
+
+        order = np.lexsort((labels, sources))
+        sources, labels, destinations = sources[order], labels[order], destinations[order]
+
+        masks = np.zeros(len(states), dtype='uint32')
+        np.bitwise_or.at(masks, sources, (1 << labels).astype('uint32'))
+        masks[ends] |= 1 << cls.TERMINAL
+        offsets = np.searchsorted(sources, np.arange(len(states))).astype('uint32')
+
+        return cls(masks, offsets, destinations.astype('uint32'))
+
+    def child(self, node: int, letter: int):
+        """ :return: the node reached from the argument node along the edge
+        labelled with the argument letter ordinal, or None if there is no such edge """
+        mask = self.masks[node]
+        if not (mask >> letter) & 1:
+            return None
+        # edges are stored in label order, so count the labels below this one:
+        return self.targets[self.offsets[node] + bin(mask & ((1 << letter) - 2)).count('1')]
+
+    def follow(self, node: int, letters):
+        """ :param letters: a string of letters, or a sequence of letter ordinals
+        :return: the node reached by walking all the argument letters from the argument node,
+        or None if the argument node is None or the path doesn't exist """
+        for letter in letters:
+            if node is None:
+                return None
+            node = self.child(node, letter if isinstance(letter, int) else ord(letter) - 64)
+        return node
+
+    def heights(self):
+        """ :return: for every node, the most letters on any path from it to the end of a word
+        (worked out the first time it's asked for, which takes a second or so for a full lexicon) """
+        if self.node_heights is None:
+            masks, offsets, targets = self.arrays
+            offsets = offsets.astype('int64')
+            sources = np.repeat(np.arange(len(masks)), np.diff(np.append(offsets, len(targets))))
+            # edges are stored in label order, so label them by walking each node's set bits:
+            letter_edges = np.ones(len(targets), dtype='int64')
+            edge = offsets.copy()
+            for label in range(1, self.SEPARATOR + 1):
+                has_label = ((masks >> label) & 1).astype(bool)
+                if label == self.SEPARATOR:
+                    letter_edges[edge[has_label]] = 0
+                edge[has_label] += 1
+
+            # relax every edge until nothing changes (as many rounds as the longest word):
+            heights = np.where(masks & (1 << self.TERMINAL), 0, -1)
+            while True:
+                reached = np.where(heights[targets] >= 0, heights[targets] + letter_edges, -1)
+                new_heights = heights.copy()
+                np.maximum.at(new_heights, sources, reached)
+                if (new_heights == heights).all():
+                    break
+                heights = new_heights
+            self.node_heights = memoryview(heights.astype('int8'))
+        return self.node_heights
+
+    def is_terminal(self, node: int):
+        """ :return: True if a word ends at the argument node """
+        return node is not None and bool(self.masks[node] & (1 << self.TERMINAL))
+
+    def letters(self, node: int):
+        """ :return: bitmask of the letters (A at bit 1 to Z at bit 26) labelling edges out of the argument node """
+        return self.masks[node] & self.LETTERS
+
+    def children(self, node: int):
+        """ :return: list of (letter ordinal, node) pairs for every edge out of the argument node """
+        mask = self.masks[node]
+        first_edge = self.offsets[node]
+        labels = [label for label in range(1, self.SEPARATOR + 1) if (mask >> label) & 1]
+        return [(labels[i], self.targets[first_edge + i]) for i in range(len(labels))]
+
+    def anchor_node(self, fragment: str):
+        """ :return: the node reached by walking an existing fragment of a word
+        outwards from its last letter, i.e. ready to grow it leftwards, or None if no word contains it """
+        return self.follow(self.ROOT, fragment.upper()[::-1])
+
+    def extensions(self, node: int, left: str = '', right: str = ''):
+        """ :return: list of (left, right) pairs, splitting every word reachable from the argument node
+        at the separator, where the argument left and right are the letters walked so far
+        either side of the separator (right being empty if it hasn't been crossed yet) """
+        words = []
+        stack = [(node, left, right, right != '')]
+        while stack:
+            node, left, right, crossed = stack.pop()
+            if crossed and self.is_terminal(node):
+                words.append((left, right))
+            for letter, next_node in self.children(node):
+                if letter == self.SEPARATOR:
+                    if not crossed:
+                        stack.append((next_node, left, right, True))
+                elif crossed:
+                    stack.append((next_node, left, right + chr(64 + letter), True))
+                else:
+                    stack.append((next_node, chr(64 + letter) + left, right, False))
+        return words
+
+
+class AnagramIndex:
+    """ Index of the lexicon's words by their letters in alphabetical order
+    (so APPLE is filed under AELPP), for finding every word a set of tiles can make
+    without searching the board. Keys and words are held in parallel sorted arrays
+    of fixed width byte strings, which can be mapped straight from the index file. """
+
+    # characters standing for a blank tile in a set of tiles:
+    BLANKS = '@?'
+
+    def __init__(self, keys: np.ndarray, words: np.ndarray):
+        self.keys = keys
+        self.words = words
+        self.counts = None
+
+    @classmethod
+    def from_words(cls, words):
+        """ Builds an index of the argument list of (uppercase) words """
+        entries = sorted([(''.join(sorted(word)), word) for word in words])
+        width = max([len(word) for word in words] + [1])
+        return cls(np.array([key.encode() for key, word in entries], dtype='S' + str(width)),
+                   np.array([word.encode() for key, word in entries], dtype='S' + str(width)))
+
+    def words_for(self, key: bytes):
+        """ :return: list of the words whose letters, in alphabetical order, are exactly the argument key """
+        first = np.searchsorted(self.keys, key, side='left')
+        last = np.searchsorted(self.keys, key, side='right')
+        return [word.decode() for word in self.words[first:last]]
+
+    def spell_words(self, ordinals: np.ndarray):
+        """ :param ordinals: array of the ordinals of sets of tiles, a set to a row, in ascending order
+        (so blanks, as 0, come first)
+        :return: boolean array, True for each set of tiles which, all together, spell a word
+        (blanks standing for any letter), looked up for all the sets at once """
+        spelt = np.zeros(len(ordinals), dtype=bool)
+        blanks = (ordinals == 0).sum(axis=1)
+        for count in np.unique(blanks).tolist():
+            rows = np.nonzero(blanks == count)[0]
+            letters = ordinals[rows, count:]
+            # try the blanks as every combination of letters:
+            for filling in combinations_with_replacement(range(1, 27), count):
+                tiles = np.hstack([letters, np.tile(np.array(filling, dtype=ordinals.dtype), (len(rows), 1))])
+                keys = np.ascontiguousarray(np.sort(tiles, axis=1) + 64, dtype='uint8')
+                keys = keys.view('S' + str(keys.shape[1])).ravel()
+                found = np.minimum(np.searchsorted(self.keys, keys), len(self.keys) - 1)
+                spelt[rows] |= self.keys[found] == keys
+        return spelt
+
+    def has_prefix(self, prefix: bytes):
+        """ :return: True if any key starts with the argument letters """
+        index = np.searchsorted(self.keys, prefix)
+        return index < len(self.keys) and self.keys[index].startswith(prefix)
+
+    def letter_counts(self):
+        """ :return: array of how many times each letter (A in row 1 to Z in row 26) appears in each word,
+        in key order, with the length of each word in row 0 (worked out the first time it's asked for) """
+        if self.counts is None:
+            letters = self.keys.view('uint8').reshape(len(self.keys), -1)
+            self.counts = np.stack([(letters > 0).sum(axis=1, dtype='uint8')] + [
+                (letters == 64 + letter).sum(axis=1, dtype='uint8') for letter in range(1, 27)])
+        return self.counts
+
+    def shortest_holding(self, tiles: str):
+        """ :return: the length of the shortest word holding every one of the supplied tiles, where each
+        blank ('@' or '?') can stand for any letter, or None if there's no such word (e.g. for how many
+        letters already on the board a rack would have to be played through to use it all in one word) """
+        tiles = tiles.upper()
+        counts = self.letter_counts()
+        # words long enough for every tile, holding as many of each letter as there are real tiles for it:
+        holding = counts[0] >= len(tiles)
+        for letter in set(tiles) - set(self.BLANKS):
+            holding &= counts[ord(letter) - 64] >= tiles.count(letter)
+        lengths = counts[0][holding]
+        return int(lengths.min()) if len(lengths) else None
+
+    def anagrams(self, tiles: str, use_all: bool = False):
+        """ Returns a sorted list of all words which can be made from the supplied tiles,
+        where each of up to two blanks ('@' or '?') can stand for any letter.
+        :param use_all: Optional. If True, only words using every tile are returned (e.g. for spotting bingos).
+        """
+        tiles = tiles.upper()
+        blanks = len([tile for tile in tiles if tile in self.BLANKS])
+        if blanks > 2:
+            raise ValueError("Too many blanks: " + tiles)
+        counts = [0] * 27
+        for tile in tiles:
+            if tile not in self.BLANKS:
+                counts[ord(tile) - 64] += 1
+
+        words = []
+        # build up keys a letter at a time in alphabetical order, using a real tile for each
+        # letter while there is one left, and otherwise a blank, abandoning any partial key
+        # that no word starts with:
+        stack = [(b'', 1, len(tiles), blanks)]
+        while stack:
+            prefix, first_letter, tiles_left, blanks_left = stack.pop()
+            if prefix and (tiles_left == 0 or not use_all):
+                words.extend(self.words_for(prefix))
+            if tiles_left == 0:
+                continue
+            used = [0] * 27
+            for c in prefix:
+                used[c - 64] += 1
+            for letter in range(first_letter, 27):
+                real_tile = used[letter] < counts[letter]
+                if not real_tile and not blanks_left:
+                    continue
+                next_prefix = prefix + bytes([64 + letter])
+                if self.has_prefix(next_prefix):
+                    stack.append((next_prefix, letter, tiles_left - 1, blanks_left - (not real_tile)))
+
+        return sorted(words)
 
 
 class Lexicon:
@@ -9,48 +368,228 @@ class Lexicon:
     Named 'Lexicon' to avoid confusion with Python's inbuilt
     dictionary data structure. """
 
-    def __init__(self):
-        """ Create a new lexicon """
+    def __init__(self, path: str = None, rebuild_indexes: bool = False):
+        """ Create a new lexicon.
+        :param path: Optional. The word list to load, defaults to csw.dawg. Either a lexicon file
+        (see save()), which holds the word list and all its indexes, or a DAWG of the word list.
+        :param rebuild_indexes: Optional. If True, the index file of a DAWG is always rebuilt and rewritten.
+        The derived GADDAG and anagram index of a DAWG are read from the index file alongside it,
+        and are only rebuilt (and the index file rewritten) if that file is missing or stale.
+        """
+        self.path = path or os.path.join(ROOT_DIR, DEFAULT_LEXICON_FILE)
+
+        if os.path.splitext(self.path)[1] == LEXICON_EXTENSION:
+            if not self.load_indexes(self.path):
+                raise ValueError("Not a lexicon file of version " + str(INDEX_VERSION) + ": " + self.path)
+            return
+
         self.word_list = CompletionDAWG()
-        self.word_list.load(os.path.join(sys.path[0], 'csw.dawg'))
-        sll_suffixes = []
-        temp_suffixes = self.list_words()
-        while temp_suffixes:
-            temp_suffixes = list(set([temp_suffixes[i][1:] for i in range(len(temp_suffixes)) if len(temp_suffixes[i]) > 1]))
-            sll_suffixes.extend(temp_suffixes)
-        sll_suffixes = sorted(list(set(sll_suffixes)))
-        self.suffix_list = CompletionDAWG(sll_suffixes)
+        self.word_list.load(self.path)
+
+        if rebuild_indexes:
+            self.build_indexes()
+            self.save_indexes(index_path(self.path))
+        elif not self.load_indexes(index_path(self.path)):
+            self.build_indexes()
+            try:
+                self.save_indexes(index_path(self.path))
+            except OSError:
+                pass  # read-only location, we'll just have to rebuild next time
+
+    @classmethod
+    def from_words(cls, words):
+        """ Creates a lexicon of the argument list of words, without reading or writing any files """
+        lexicon = cls.__new__(cls)
+        lexicon.path = None
+        lexicon.word_list = CompletionDAWG(sorted(set([word.upper() for word in words])))
+        lexicon.build_indexes()
+        return lexicon
+
+    def build_indexes(self):
+        """ Derives the GADDAG and anagram index from the word list """
+        self.gaddag = Gaddag.from_words(self.list_words())
+        self.anagram_index = AnagramIndex.from_words(self.list_words())
+
+    def load_indexes(self, path: str):
+        """ Maps the derived GADDAG and anagram index (and the word list itself, if the file holds one)
+        from an index file into memory. The file is mapped read-only rather than read, so every
+        process using the same file shares one copy of it in the OS page cache,
+        and opening it costs next to nothing.
+        :return: False if the file is missing, of another version, or was built from a different word list
+        """
+        try:
+            with open(path, 'rb') as index_file:
+                data = mmap.mmap(index_file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):  # ValueError if the file is empty
+            return False
+
+        if len(data) < INDEX_HEADER.size:
+            return False
+        magic, version, digest, num_sections = INDEX_HEADER.unpack_from(data)
+        if magic != INDEX_MAGIC or version != INDEX_VERSION:
+            return False
+
+        sections = []
+        offset = INDEX_HEADER.size
+        for i in range(num_sections):
+            offset += -offset % SECTION_ALIGNMENT
+            length, dtype = SECTION_HEADER.unpack_from(data, offset)
+            offset += SECTION_HEADER.size
+            dtype = np.dtype(dtype.rstrip(b'\0').decode())
+            # arrays are views onto the mapped file, and keep it open for as long as they're in use:
+            sections.append(np.frombuffer(data, dtype=dtype, count=length // dtype.itemsize, offset=offset))
+            offset += length
 
-        self.reverse_list = CompletionDAWG(sorted([word[::-1] for word in self.list_words()]))
+        if len(sections) > WORD_LIST_SECTION:
+            # the file carries its own word list, which the digest was taken from:
+            word_list = sections[WORD_LIST_SECTION].tobytes()
+            if digest != hashlib.sha1(word_list).digest():
+                return False
+            self.word_list = CompletionDAWG().frombytes(word_list)
+        elif digest != source_digest(self.path):
+            return False
+
+        self.gaddag = Gaddag(*sections[:3])
+        self.anagram_index = AnagramIndex(*sections[3:5])
+        return True
+
+    def save_indexes(self, path: str, include_word_list: bool = False):
+        """ Writes the derived GADDAG and anagram index to an index file, keyed by the digest of the source word list.
+        :param include_word_list: Optional. If True, the word list itself is written to the file
+        too (and the digest taken from that), so the file can be loaded on its own.
+        """
+        sections = [array.astype('<u4') for array in self.gaddag.arrays]
+        sections += [self.anagram_index.keys, self.anagram_index.words]
+        if include_word_list:
+            word_list = self.word_list.tobytes()
+            sections.append(np.frombuffer(word_list, dtype='uint8'))
+            digest = hashlib.sha1(word_list).digest()
+        else:
+            digest = source_digest(self.path)
+
+        # write to a temporary file first, so a concurrent reader never sees a half-written index:
+        temp_path = path + '.' + str(os.getpid()) + '.tmp'
+        with open(temp_path, 'wb') as index_file:
+            index_file.write(INDEX_HEADER.pack(INDEX_MAGIC, INDEX_VERSION, digest, len(sections)))
+            for section in sections:
+                index_file.write(bytes(-index_file.tell() % SECTION_ALIGNMENT))
+                index_file.write(SECTION_HEADER.pack(section.nbytes, section.dtype.str.encode()))
+                index_file.write(section.tobytes())
+        os.replace(temp_path, path)
+
+    def save(self, path: str):
+        """ Writes this lexicon to a single lexicon file (which should have the .lex extension),
+        holding the word list and all its indexes, ready to be mapped straight back in """
+        self.save_indexes(path, include_word_list=True)
+
+    def __getstate__(self):
+        """ Pickles as just the path of the word list, so a worker process
+        re-opens (and shares the mapping of) the file rather than being sent a copy """
+        if self.path is None:
+            return {'words': self.list_words()}
+        return {'path': self.path}
+
+    def __setstate__(self, state):
+        if 'words' in state:
+            self.__dict__.update(Lexicon.from_words(state['words']).__dict__)
+        else:
+            self.__init__(state['path'])
 
     def contains(self, word: str):
         """ Returns True if the supplied word is in the lexicon """
         return word.upper() in self.word_list
 
+    def contains_all(self, words):
+        """ Checks many words at once.
+        :param words: a list of strings, or of sequences of letter ordinals (A=1, B=2, etc, with blanks
+        as on the game board, i.e. a=33), or a 2D integer array with a word per row padded with zeros
+        :return: numpy boolean array, True for each word which is in the lexicon
+        """
+        if isinstance(words, np.ndarray) and words.ndim == 2:
+            # convert every row to ascii at once (blanks fold onto their letters, padding becomes null bytes):
+            letters = np.ascontiguousarray(np.where(words > 0, words % 32 + 64, 0).astype('uint8'))
+            keys = letters.view('S' + str(letters.shape[1])).ravel().tolist()
+        else:
+            keys = [word.upper().encode() if isinstance(word, str)
+                    else bytes([int(letter) % 32 + 64 for letter in word if letter > 0]) for word in words]
+
+        # one call into the DAWG per word (walking shared prefixes from Python was measured to be
+        # slower than letting the DAWG walk each word from the start):
+        return np.fromiter(map(self.word_list.b_has_key, keys), dtype='bool', count=len(keys))
+
     def starts_with(self, prefix: str):
         """ Returns a list of all valid words in the lexicon starting with the supplied prefix """
         return self.word_list.keys(prefix.upper())
 
     def ends_with(self, suffix: str):
-        return self.suffix_list.keys(suffix.upper())
+        """ Returns a list of all endings of valid words (with at least one letter
+        in front of them) which start with the supplied fragment """
+        node = self.gaddag.anchor_node(suffix)
+        if node is None:
+            return []
+        suffix = suffix.upper()
+        endings = set()
+        for letter, next_node in self.gaddag.children(node):
+            if letter != Gaddag.SEPARATOR:
+                endings.update([suffix + right for left, right in self.gaddag.extensions(next_node, suffix)])
+        return sorted(endings)
 
     def contains_prefix(self, prefix: str):
-        return len(self.starts_with(prefix.upper())) > 1
+        """ Returns True if a longer valid word starts with the supplied fragment.
+        Walks the GADDAG rather than listing the completions, so costs O(len(prefix)) """
+        node = self.gaddag.follow(self.gaddag.anchor_node(prefix), [Gaddag.SEPARATOR])
+        return node is not None and self.gaddag.letters(node) != 0
 
     def contains_suffix(self, suffix: str):
-        return len(self.ends_with(suffix.upper())) > 1
+        return self.contains_infix(suffix)
 
     def contains_infix(self, infix):
-        return len(self.suffix_list.keys(infix.upper())) > 1
+        """ Returns True if the supplied fragment appears in a valid word with at least one letter in front of it """
+        node = self.gaddag.anchor_node(infix)
+        return node is not None and self.gaddag.letters(node) != 0
 
     def contains_word_or_prefix(self, prefix):
-        return len(self.starts_with(prefix)) > 0
+        """ Returns True if any valid word starts with the supplied fragment (stops at the first one found) """
+        return self.word_list.has_keys_with_prefix(prefix.upper())
 
     def words_containing(self, infix: str):
-        suffixes_starting_with_infix = self.suffix_list.keys(infix.upper())
-        words = []
-        [words.extend(self.reverse_list.keys(suffix[::-1])) for suffix in suffixes_starting_with_infix]
-        return sorted([word[::-1] for word in words])
+        """ Returns a list of all valid words in the lexicon containing the supplied fragment """
+        node = self.gaddag.anchor_node(infix)
+        if node is None:
+            return []
+        return sorted(set([left + right for left, right in self.gaddag.extensions(node, infix.upper())]))
+
+    def crosscheck_mask(self, left: str, right: str):
+        """ Returns a bitmask of the letters (A at bit 1 to Z at bit 26) which form a valid word
+        when placed in the gap between the supplied left and right fragments (either may be empty).
+        Walks the left fragment once, then only follows the letters the GADDAG allows after it """
+        gaddag = self.gaddag
+        right = right.upper()
+        valid_letters = 0
+
+        if left:
+            # grow leftwards through the left fragment, cross over, then try each letter in the gap:
+            node = gaddag.follow(gaddag.anchor_node(left), [Gaddag.SEPARATOR])
+            if node is None:
+                return 0
+            for letter, next_node in gaddag.children(node):
+                if letter != Gaddag.SEPARATOR and gaddag.is_terminal(gaddag.follow(next_node, right)):
+                    valid_letters |= 1 << letter
+        else:
+            # grow leftwards through the right fragment, then the gap letter must start the word:
+            node = gaddag.anchor_node(right)
+            if node is None:
+                return 0
+            for letter, next_node in gaddag.children(node):
+                if letter != Gaddag.SEPARATOR and gaddag.is_terminal(gaddag.child(next_node, Gaddag.SEPARATOR)):
+                    valid_letters |= 1 << letter
+
+        return valid_letters
+
+    def anagrams(self, tiles: str, use_all: bool = False):
+        """ Returns a sorted list of all valid words which can be made from the supplied tiles
+        (blanks as '@' or '?', up to two), or only those using every tile if use_all is True """
+        return self.anagram_index.anagrams(tiles, use_all)
 
     def list_words(self):
         """ Returns a list of all valid words in the lexicon """
@@ -58,3 +597,156 @@ class Lexicon:
 
     def __contains__(self, item):
         return self.contains(item)
+
+
+class MemoizedLexicon:
+    """ Wraps a lexicon, remembering the answers to the most recently asked word,
+    prefix and infix queries (least recently used answers are forgotten first).
+    Anything else is passed straight through to the wrapped lexicon, so this can
+    stand in for a Lexicon wherever one is used. """
+
+    def __init__(self, lexicon: Lexicon, max_size: int):
+        """ :param lexicon: the lexicon to wrap
+        :param max_size: the number of answers to remember
+        """
+        self.lexicon = lexicon
+        self.max_size = max_size
+        self.answers = OrderedDict()
+        # move generation asks from several threads at once:
+        self.lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def ask(self, query, fragment: str):
+        """ :return: the answer to the argument query about the argument fragment, from the cache if possible """
+        key = (query, fragment.upper())
+        with self.lock:
+            if key in self.answers:
+                self.hits += 1
+                self.answers.move_to_end(key)
+                return self.answers[key]
+            self.misses += 1
+
+        answer = query(key[1])
+
+        with self.lock:
+            self.answers[key] = answer
+            if len(self.answers) > self.max_size:
+                self.answers.popitem(last=False)
+                self.evictions += 1
+        return answer
+
+    def contains(self, word: str):
+        return self.ask(self.lexicon.contains, word)
+
+    def contains_prefix(self, prefix: str):
+        return self.ask(self.lexicon.contains_prefix, prefix)
+
+    def contains_infix(self, infix: str):
+        return self.ask(self.lexicon.contains_infix, infix)
+
+    def __contains__(self, item):
+        return self.contains(item)
+
+    def stats(self):
+        """ :return: dictionary of the cache's counters, for tuning its size """
+        lookups = self.hits + self.misses
+        return {'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'size': len(self.answers),
+                'max_size': self.max_size,
+                'hit_rate': self.hits / lookups if lookups else 0.0}
+
+    def clear(self):
+        """ Forgets all remembered answers and resets the counters """
+        with self.lock:
+            self.answers.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def __getattr__(self, name):
+        # only called for attributes not found on the wrapper itself:
+        if name == 'lexicon':
+            raise AttributeError(name)
+        return getattr(self.lexicon, name)
+
+    def __getstate__(self):
+        return {'lexicon': self.lexicon, 'max_size': self.max_size}
+
+    def __setstate__(self, state):
+        self.__init__(state['lexicon'], state['max_size'])
+
+
+def shared_lexicon(path: str = None):
+    """ Returns the process-wide lexicon for the argument word list (defaults to csw.dawg),
+    loading it the first time it's asked for. Lexicons are never modified once loaded,
+    so one instance can serve every game, validator and player in the process.
+    """
+    path = os.path.abspath(os.path.join(ROOT_DIR, path or DEFAULT_LEXICON_FILE))
+    with shared_lexicons_lock:
+        if path not in shared_lexicons:
+            shared_lexicons[path] = Lexicon(path)
+        return shared_lexicons[path]
+
+
+def register_lexicon(name: str, path: str):
+    """ Makes a word list available by name to get_lexicon(),
+    e.g. register_lexicon('TWL', 'twl.lex') (relative paths are from the repository root) """
+    registered_lexicons[name.upper()] = path
+
+
+def get_lexicon(name: str = DEFAULT_LEXICON):
+    """ Returns the process-wide lexicon registered under the argument name, loading it the first time """
+    try:
+        return shared_lexicon(registered_lexicons[name.upper()])
+    except KeyError:
+        raise ValueError("No lexicon registered as " + name + ", only: " + ', '.join(sorted(registered_lexicons)))
+
+
+def index_path(dawg_path: str):
+    """ :return: the path of the index file kept alongside the argument word list """
+    return os.path.splitext(dawg_path)[0] + '.idx'
+
+
+def source_digest(dawg_path: str):
+    """ :return: the sha1 digest of the argument word list, which keys its index file """
+    sha1 = hashlib.sha1()
+    with open(dawg_path, 'rb') as dawg_file:
+        for block in iter(lambda: dawg_file.read(1 << 20), b''):
+            sha1.update(block)
+    return sha1.digest()
+
+
+def read_word_list(text_path: str):
+    """ :return: list of the words in a plain text word list, one per line. Anything after the first
+    word on a line (e.g. a definition) is ignored, as are blank lines and lines starting with '#'. """
+    words = []
+    with open(text_path) as text_file:
+        for line_number, line in enumerate(text_file, 1):
+            fields = line.split()
+            if not fields or fields[0].startswith('#'):
+                continue
+            word = fields[0].upper()
+            if not (word.isalpha() and word.isascii()):
+                raise ValueError(text_path + ", line " + str(line_number) + ": not a word: " + fields[0])
+            words.append(word)
+    return words
+
+
+def build_index_file(dawg_path: str):
+    """ (Re)builds the index file for the argument word list
+    :return: the path of the index file written
+    """
+    Lexicon(dawg_path, rebuild_indexes=True)
+    return index_path(dawg_path)
+
+
+def build_lexicon_file(text_path: str, lexicon_path: str = None):
+    """ Builds a lexicon file from a plain text word list
+    :param lexicon_path: Optional. Where to write it, defaults to alongside the word list with a .lex extension
+    :return: the path of the lexicon file written
+    """
+    lexicon_path = lexicon_path or os.path.splitext(text_path)[0] + LEXICON_EXTENSION
+    Lexicon.from_words(read_word_list(text_path)).save(lexicon_path)
+    return lexicon_path
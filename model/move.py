@@ -7,7 +7,7 @@ from model.config import LETTER_VALUES, NO_CROSS_WORD, RACK_SIZE, BONUS
 class Move:
     """ Represents a game move. """
 
-    def __init__(self, row: Row, start_index: int, tiles):
+    def __init__(self, row: Row, start_index: int, tiles, played_squares=None):
         """ Creates a game move. None of the supplied parameters
         are relevant if this is a passing move, and only the list
         of tiles is relevant for a tile exchange move. 'None' should
@@ -16,6 +16,8 @@ class Move:
         :param row: The row the move is played in
         :param start_index: The starting index in the row
         :param tiles: a list of tiles being played
+        :param played_squares: Optional. The indices of the squares the tiles go in,
+        if already known (otherwise the next empty squares from the starting index)
         """
 
         self.row = row
@@ -32,7 +34,8 @@ class Move:
             self.score = 0
         else:
             self.direction = self.row.direction
-            self.played_squares = row.empty_squares(start_index)[:len(tiles)]
+            self.played_squares = row.empty_squares(start_index)[:len(tiles)] \
+                if played_squares is None else played_squares
 
     def cross_direction(self):
         """ :return: the direction orthogonal to the move's direction of play """
@@ -94,7 +97,10 @@ class Move:
         return 'Move object:\n'+str(self)
 
     def __hash__(self):
-        return hash(str(self))
+        # everything the string (and so equality) depends on but the score, which follows from the rest:
+        if self.direction == Direction.NOT_APPLICABLE:
+            return hash(tuple(self.tiles or ()))
+        return hash((self.row.rank, self.direction.value, int(self.start_index), tuple(self.tiles)))
 
     def __eq__(self, other):
         return str(self) == str(other)
\ No newline at end of file
@@ -0,0 +1,586 @@
+from collections import OrderedDict
+from itertools import combinations, count
+import heapq
+from multiprocessing import shared_memory
+import os
+
+import numpy as np
+
+from model.board import GameBoard
+from model.config import BOARD_SIZE, BONUS, Direction, LETTER_VALUES, NO_CROSS_WORD, RACK_SIZE
+from model.lexicon import Gaddag, Lexicon
+from model.move import Move
+from model.pool import WorkerPool
+from model.row import Row
+
+# tiles for each letter ordinal, as real tiles and as blanks:
+UPPERCASE = [chr(64 + letter) for letter in range(27)]
+LOWERCASE = [tile.lower() for tile in UPPERCASE]
+
+
+class SearchStopped(Exception):
+    """ Raised to abandon a search part way through (see MoveGenerator.best_moves) """
+
+
+class MoveGenerator:
+    """ Generates all the moves playable in a row, by walking the lexicon's GADDAG
+    outwards from each anchor square (see Gordon, 'A faster Scrabble move generation
+    algorithm', which builds on Appel and Jacobson's anchor based approach).
+
+    Every hook square of the row is an anchor. Words are grown leftwards from the anchor
+    first, over existing letters or into empty squares as far as the left-part limit allows
+    (the empty squares before the next anchor to the left, since any move reaching that
+    anchor is found from it), then rightwards. The GADDAG node reached so far is carried
+    along, so each square costs one edge lookup rather than a fresh query about the whole
+    fragment, and only letters the node, the square's crosscheck and the rack all allow are tried.
+
+    Unassigned blanks ('@') are wildcards: at each empty square where the rack has no real
+    tile left for a letter the GADDAG node and the crosscheck allow, a blank is tried as that
+    letter, so the lexicon decides which letters a blank could be, rather than all 26 being
+    tried. A blank is never played as a letter whose real tile would stay on the rack (that
+    tile in its place would score more and leave the blank), and where a move holds both a
+    blank and a real tile for the same letter, the other ways of arranging them are added
+    without searching again. Blanks already assigned a letter (lowercase tiles) are treated
+    the same way, but only as that letter. """
+
+    def __init__(self, lexicon: Lexicon):
+        self.gaddag = lexicon.gaddag
+        self.anagram_index = lexicon.anagram_index
+
+    def moves_for_row(self, row: Row, rack_tiles):
+        """ :param row: the row to play in, which is left unchanged
+        :param rack_tiles: list of the tiles available to play
+        :return: list of all the valid moves in the row, scored
+        """
+        moves = []
+        self.search(row, rack_tiles, np.nonzero(row.hook_squares)[0].tolist(), moves)
+        return moves
+
+    def iter_moves(self, rows, rack_tiles):
+        """ Generates the moves playable in the rows an anchor at a time, so each can be looked at as
+        soon as it's found, without every move being held at once. No move is generated twice: the
+        left-part limit means a move is only found from the leftmost anchor it covers, and blanks
+        are only swapped with real tiles to give arrangements that differ.
+
+        :param rows: list of rows to play in, which are left unchanged (and mustn't be changed
+        until the moves are all generated)
+        :param rack_tiles: list of the tiles available to play
+        :return: iterator over the valid moves in the rows, scored
+        """
+        for row in rows:
+            for anchor in np.nonzero(row.hook_squares)[0].tolist():
+                moves = []
+                self.search(row, rack_tiles, [anchor], moves)
+                yield from moves
+
+    def best_moves(self, rows, rack_tiles, k: int, stop=None):
+        """ Finds just the highest scoring moves, skipping any part of the search which couldn't beat them.
+
+        The most any move from an anchor could score is worked out first (see AnchorBounds), and anchors
+        are searched most promising first, so that once k moves have been found, the rest of the anchors
+        can often be skipped altogether. Within an anchor's search, the same bound is checked again at
+        each empty square for the word built so far and the tiles left, cutting off words which couldn't
+        beat the k best found so far.
+
+        Searching the most promising anchors first also means that if the search has to be cut short,
+        the best moves found by then are likely to be good ones.
+
+        :param rows: list of rows to play in, which are left unchanged
+        :param rack_tiles: list of the tiles available to play
+        :param k: the number of moves wanted
+        :param stop: Optional. Function called as the search goes, which returns True when it should stop
+        (e.g. when time is up), in which case the best moves found so far are returned
+        :return: list of the k highest scoring moves (fewer if there aren't k), highest first
+        """
+        values = sorted([LETTER_VALUES[0] if tile == '@' or tile.islower() else LETTER_VALUES[ord(tile) - 64]
+                         for tile in rack_tiles], reverse=True)
+        bingo_length = self.anagram_index.shortest_holding(''.join(rack_tiles)) \
+            if len(rack_tiles) == RACK_SIZE else None
+        anchors = []
+        for row in rows:
+            lines = RowLines(row)
+            for anchor in np.nonzero(row.hook_squares)[0].tolist():
+                bounds = AnchorBounds(lines, anchor, values, bingo_length)
+                anchors.append((bounds.bound(0, 1, 0, len(values)), len(anchors), row, anchor, bounds))
+        anchors.sort(key=lambda entry: (-entry[0], entry[1]))
+
+        # the best moves found so far, as a heap of (score, -order found, row, squares) with the lowest first:
+        best = []
+        order = count()
+        for bound, i, row, anchor, bounds in anchors:
+            if len(best) >= k and bound <= best[0][0]:
+                break
+            try:
+                self.search(row, rack_tiles, [anchor], best, k, bounds, order, stop)
+            except SearchStopped:
+                break
+
+        moves = []
+        for score, order, row, squares in sorted(best, reverse=True):
+            move = Move(row, squares[0][0], [tile for square, tile in squares],
+                        np.array([square for square, tile in squares]))
+            move.score = score
+            moves.append(move)
+        return moves
+
+    def search(self, row: Row, rack_tiles, anchors, moves, k: int = None, bounds: 'AnchorBounds' = None,
+               order=None, stop=None):
+        """ Searches for moves from the given anchors of the row.
+
+        :param moves: list the moves found are added to, or with k, the heap of best moves (see best_moves)
+        :param k: Optional. Only keep the k highest scoring moves
+        :param bounds: Optional, with k. Bounds on the scores of moves from the anchor, to prune the search
+        :param order: Optional, with k. Counter numbering the moves found, so ties go to the first found
+        :param stop: Optional. Function checked at each empty square, which returns True to abandon
+        the search by raising SearchStopped (leaving the moves found so far)
+        """
+        if not anchors:
+            return
+
+        gaddag = self.gaddag
+        child = gaddag.child
+        masks = gaddag.masks
+        if bounds:
+            heights = gaddag.heights()
+            bound_main_scores = bounds.main_scores
+            bound_cross_scores = bounds.cross_scores
+            bound_multipliers = bounds.word_multipliers
+            bonus = bounds.bonus
+            blank_swap = bounds.blank_swap
+            best_word_multiplier = bounds.best_word_multiplier
+        letters = row.existing_letters.tolist()
+        is_hook = row.hook_squares.tolist()
+        crosschecks = row.this_row_crosschecks.tolist()
+        letter_multipliers = row.letter_multipliers.tolist()
+        word_multipliers = row.word_multipliers.tolist()
+        letter_scores = row.existing_letter_scores.tolist()
+        cross_scores = row.this_row_cross_scores.tolist()
+
+        rack = {}
+        for tile in rack_tiles:
+            rack[tile] = rack.get(tile, 0) + 1
+
+        # tiles placed so far, as (square, tile) pairs:
+        placed = []
+        if k is not None and order is None:
+            order = count()
+
+        def record(main_score, word_multiplier, cross_score):
+            squares = sorted(placed)
+            score = main_score * word_multiplier + cross_score
+            if len(squares) == RACK_SIZE:
+                score += BONUS
+            for arrangement, change in arrangements(squares, word_multiplier):
+                if k is None:
+                    move = Move(row, squares[0][0], [tile for square, tile in arrangement],
+                                np.array([square for square, tile in arrangement]))
+                    move.score = float(score + change)
+                    moves.append(move)
+                elif len(moves) < k:
+                    heapq.heappush(moves, (float(score + change), -next(order), row, arrangement))
+                elif score + change > moves[0][0]:
+                    heapq.heapreplace(moves, (float(score + change), -next(order), row, arrangement))
+
+        def arrangements(squares, word_multiplier):
+            """ :return: list of (squares, change in score) pairs for the (square, tile) pairs
+            as placed, and for every other arrangement of them swapping blanks with real tiles
+            for the same letter """
+            results = [(squares, 0)]
+            for blank in set(tile for square, tile in squares if tile.islower()):
+                positions = [i for i, (square, tile) in enumerate(squares) if tile.upper() == blank.upper()]
+                blank_count = sum(squares[i][1] == blank for i in positions)
+                if blank_count == len(positions):
+                    continue
+                # a tile's value counts once for the word, and again for any cross-word:
+                value = LETTER_VALUES[ord(blank) - 96]
+                weights = {squares[i][0]: letter_multipliers[squares[i][0]] * (
+                    word_multiplier + (word_multipliers[squares[i][0]]
+                                       if cross_scores[squares[i][0]] != NO_CROSS_WORD else 0))
+                           for i in positions}
+                placed_value = sum(weights[squares[i][0]] * value for i in positions if squares[i][1] != blank)
+                rearranged = []
+                for arrangement, change in results:
+                    for blanks in combinations(positions, blank_count):
+                        rearranged.append((
+                            [(square, (blank if i in blanks else blank.upper()) if i in positions else tile)
+                             for i, (square, tile) in enumerate(arrangement)],
+                            change - placed_value + sum(weights[squares[i][0]] * value
+                                                        for i in positions if i not in blanks)))
+                results = rearranged
+            return results
+
+        def extend(anchor, square, node, leftwards, main_score, word_multiplier, cross_score):
+            """ plays (or follows an existing letter) in the square, then goes on from there """
+            letter = letters[square]
+            if letter > 0:
+                next_node = child(node, letter % 32)
+                if next_node is not None:
+                    go_on(anchor, square, next_node, leftwards,
+                          main_score + letter_scores[square] * letter_multipliers[square],
+                          word_multiplier, cross_score)
+                return
+
+            if stop is not None and stop():
+                raise SearchStopped
+
+            # give up on the word if it couldn't score enough to be one of the best moves
+            # (see AnchorBounds.bound, written out here as it's checked so often):
+            if bounds and len(moves) >= k:
+                tiles_left = len(rack_tiles) - len(placed)
+                letters_left = heights[node]
+                if letters_left < tiles_left:
+                    tiles_left = letters_left
+                    extra = 0
+                else:
+                    extra = bonus
+                multiplier = word_multiplier * bound_multipliers[tiles_left]
+                if (main_score + bound_main_scores[tiles_left]) * multiplier + cross_score \
+                        + bound_cross_scores[tiles_left] + extra + blank_swap * (multiplier + best_word_multiplier) \
+                        <= moves[0][0]:
+                    return
+
+            # letters the lexicon allows next, which don't spoil the cross-word in this square:
+            allowed = masks[node] & crosschecks[square] & Gaddag.LETTERS
+            blanks = rack.get('@')
+            while allowed:
+                # take the lowest letter left:
+                bit = allowed & -allowed
+                allowed ^= bit
+                letter = bit.bit_length() - 1
+                tile = UPPERCASE[letter]
+                if rack.get(tile):
+                    play(anchor, square, node, leftwards, main_score, word_multiplier, cross_score,
+                         letter, tile, tile)
+                elif rack.get(LOWERCASE[letter]):  # a blank assigned this letter
+                    play(anchor, square, node, leftwards, main_score, word_multiplier, cross_score,
+                         letter, LOWERCASE[letter], LOWERCASE[letter])
+                elif blanks:
+                    play(anchor, square, node, leftwards, main_score, word_multiplier, cross_score,
+                         letter, LOWERCASE[letter], '@')
+
+        def play(anchor, square, node, leftwards, main_score, word_multiplier, cross_score, letter, tile, rack_tile):
+            """ places the tile (taken from the rack as rack_tile) in the empty square, then goes on from there """
+            value = LETTER_VALUES[letter] if tile.isupper() else LETTER_VALUES[0]
+            tile_score = value * letter_multipliers[square]
+            rack[rack_tile] -= 1
+            placed.append((square, tile))
+            go_on(anchor, square, child(node, letter), leftwards,
+                  main_score + tile_score,
+                  word_multiplier * word_multipliers[square],
+                  cross_score + ((tile_score + cross_scores[square]) * word_multipliers[square]
+                                 if cross_scores[square] != NO_CROSS_WORD else 0))
+            placed.pop()
+            rack[rack_tile] += 1
+
+        def go_on(anchor, square, node, leftwards, main_score, word_multiplier, cross_score):
+            tiles_left = len(placed) < len(rack_tiles)
+            if leftwards:
+                # the word can only start here if there's no letter immediately before it:
+                if letters[square - 1] <= 0:
+                    right_node = child(node, Gaddag.SEPARATOR)
+                    if right_node is not None:
+                        if letters[anchor + 1] <= 0 and gaddag.is_terminal(right_node):
+                            record(main_score, word_multiplier, cross_score)
+                        if anchor + 1 < BOARD_SIZE:
+                            extend(anchor, anchor + 1, right_node, False, main_score, word_multiplier, cross_score)
+                # carry on leftwards over an existing letter, or into an empty square within the left-part limit:
+                if square - 1 >= 1 and (letters[square - 1] > 0 or (tiles_left and not is_hook[square - 1])):
+                    extend(anchor, square - 1, node, True, main_score, word_multiplier, cross_score)
+            else:
+                if letters[square + 1] <= 0 and gaddag.is_terminal(node):
+                    record(main_score, word_multiplier, cross_score)
+                if square + 1 < BOARD_SIZE and (letters[square + 1] > 0 or tiles_left):
+                    extend(anchor, square + 1, node, False, main_score, word_multiplier, cross_score)
+
+        for anchor in anchors:
+            extend(anchor, anchor, Gaddag.ROOT, True, 0, 1, 0)
+
+
+class RowLines:
+    """ The arrays of a row as lists, which index to plain ints much faster """
+
+    def __init__(self, row: Row):
+        self.letters = row.existing_letters.tolist()
+        self.is_hook = row.hook_squares.tolist()
+        self.letter_multipliers = row.letter_multipliers.tolist()
+        self.word_multipliers = row.word_multipliers.tolist()
+        self.letter_scores = row.existing_letter_scores.tolist()
+        self.cross_scores = row.this_row_cross_scores.tolist()
+
+
+class AnchorBounds:
+    """ Optimistic bounds on the score of any move played from an anchor square, so that searches
+    which couldn't produce a good enough move can be skipped.
+
+    Any move from the anchor covers empty squares within a window: up to the left-part limit
+    leftwards, and no further either way than the rack has tiles. Whatever the word, its score
+    is at most what the highest valued tiles left would make on the best multipliers in the
+    window (pairing the largest values with the largest multipliers), with every existing
+    letter near the window added to the word, and the bonus only if the window, with the
+    existing letters either side of it, has room for some word holding the whole rack. """
+
+    def __init__(self, lines: RowLines, anchor: int, values, bingo_length: int = RACK_SIZE):
+        """ :param lines: the row the anchor is in
+        :param anchor: index of the anchor square
+        :param values: the values of the tiles on the rack, highest first
+        :param bingo_length: Optional. The length of the shortest word holding every tile on the rack
+        (see AnagramIndex.shortest_holding), or None if there's none
+        """
+        letters = lines.letters
+        window = [anchor]
+        square = anchor - 1
+        while square >= 1 and len(window) < len(values) and (letters[square] > 0 or not lines.is_hook[square]):
+            if letters[square] <= 0:
+                window.append(square)
+            square -= 1
+        placed = 0
+        square = anchor + 1
+        while square < BOARD_SIZE and placed < len(values) - 1:
+            if letters[square] <= 0:
+                window.append(square)
+                placed += 1
+            square += 1
+
+        # existing letters which could join the word, running on from either end of the window:
+        first, last = min(window), max(window)
+        while letters[first - 1] > 0:
+            first -= 1
+        while letters[last + 1] > 0:
+            last += 1
+        self.existing_score = sum(lines.letter_scores[i] for i in range(first, last + 1) if letters[i] > 0)
+
+        letter_multipliers = sorted([lines.letter_multipliers[i] for i in window], reverse=True)
+        word_multipliers = sorted([lines.word_multipliers[i] for i in window], reverse=True)
+        cross_multipliers = sorted([lines.letter_multipliers[i] * lines.word_multipliers[i] for i in window],
+                                   reverse=True)
+        cross_scores = sorted([lines.cross_scores[i] * lines.word_multipliers[i] for i in window
+                               if lines.cross_scores[i] != NO_CROSS_WORD], reverse=True)
+
+        # most that the r best tiles could add to the word (with the existing letters), to cross-words,
+        # and multiply the word by:
+        self.main_scores = [self.existing_score]
+        self.cross_scores = [0]
+        self.word_multipliers = [1]
+        for r in range(len(values)):
+            if r < len(window):
+                self.main_scores.append(self.main_scores[-1] + values[r] * letter_multipliers[r])
+                self.cross_scores.append(self.cross_scores[-1] + values[r] * cross_multipliers[r]
+                                         + (cross_scores[r] if r < len(cross_scores) else 0))
+                self.word_multipliers.append(self.word_multipliers[-1] * word_multipliers[r])
+            else:
+                self.main_scores.append(self.main_scores[-1])
+                self.cross_scores.append(self.cross_scores[-1])
+                self.word_multipliers.append(self.word_multipliers[-1])
+
+        self.bonus = BONUS if len(values) == RACK_SIZE and bingo_length is not None \
+            and bingo_length <= last - first + 1 else 0
+        # blanks may be swapped with real tiles for the same letter after the search (see
+        # MoveGenerator.search), moving up to the best tile value onto the best letter multiplier:
+        self.blank_swap = values.count(0) * values[0] * letter_multipliers[0]
+        self.best_word_multiplier = word_multipliers[0]
+
+    def bound(self, main_score: int, word_multiplier: int, cross_score: int, tiles_left: int,
+              letters_left: int = RACK_SIZE):
+        """ :return: the most any move could score, given the scores of the word and cross-words so far,
+        the word multiplier so far, the number of tiles still on the rack, and the most letters
+        the word could still grow by (see Gaddag.heights) """
+        # the bonus needs every tile left played, and no more tiles can be played than letters added:
+        bonus = self.bonus if letters_left >= tiles_left else 0
+        tiles_left = min(tiles_left, letters_left)
+        word_multiplier *= self.word_multipliers[tiles_left]
+        return (main_score + self.main_scores[tiles_left]) * word_multiplier \
+            + cross_score + self.cross_scores[tiles_left] + bonus \
+            + self.blank_swap * (word_multiplier + self.best_word_multiplier)
+
+
+# state of a worker process of a ParallelMoveGenerator, set up once when it starts:
+worker_state = {}
+
+
+def board_layout(board: GameBoard):
+    """ :return: list of (name, dtype, shape, offset) for laying the board's arrays
+    out one after another (8 byte aligned) in a block of memory, and the size of the block
+    """
+    layout = []
+    offset = 0
+    for name in GameBoard.ARRAYS:
+        array = getattr(board, name)
+        layout.append((name, array.dtype.str, array.shape, offset))
+        offset += -(-array.nbytes // 8) * 8
+    return layout, offset
+
+
+def board_views(buffer, layout):
+    """ :return: dictionary of arrays by name, viewing the board's arrays laid out in the buffer """
+    return {name: np.ndarray(shape, dtype=dtype, buffer=buffer, offset=offset)
+            for name, dtype, shape, offset in layout}
+
+
+def start_worker(lexicon: Lexicon, memory_name: str, layout):
+    """ sets up a worker process: attaches to the shared board and readies a move generator
+    (the lexicon arrives pickled by path, so the worker maps the same index file rather than copying it) """
+    memory = shared_memory.SharedMemory(name=memory_name)
+    worker_state['memory'] = memory
+    worker_state['board'] = GameBoard.from_arrays(board_views(memory.buf, layout))
+    worker_state['generator'] = MoveGenerator(lexicon)
+
+
+def generate_for_rows(rows, rack_tiles):
+    """ runs in a worker process: generates all moves in the given rows of the shared board
+
+    :param rows: list of (rank, direction value) of the rows to play in
+    :param rack_tiles: list of the tiles available to play
+    :return: list, one per row, of lists of moves as (start index, tiles, played squares, score)
+    """
+    board = worker_state['board']
+    generator = worker_state['generator']
+    return [[(move.start_index, move.tiles, move.played_squares.tolist(), move.score)
+             for move in generator.moves_for_row(board.get_row(rank, Direction(direction)), rack_tiles)]
+            for rank, direction in rows]
+
+
+class ParallelMoveGenerator:
+    """ Generates moves for many rows at once, spread over a pool of worker processes,
+    which (unlike threads) run the pure Python search truly in parallel.
+
+    The pool is started once and kept for the life of the generator. Each worker maps
+    the lexicon's index file and attaches to a block of shared memory holding the board,
+    so a request only has to send the rows to search and the rack, and the board is
+    brought up to date by copying its arrays into the shared block before each request.
+    Moves come back as plain tuples, and are rebuilt against the live board's rows in
+    the order the rows were given, so the result is the same whatever the pool size. """
+
+    def __init__(self, lexicon: Lexicon, board: GameBoard, processes: int = None):
+        """ :param lexicon: the lexicon, which must pickle by path (or be small), as Lexicon does
+        :param board: the game board moves are generated for
+        :param processes: Optional. Number of worker processes (default: one per CPU)
+        """
+        self.board = board
+        self.processes = processes or os.cpu_count() or 1
+        layout, size = board_layout(board)
+        self.memory = shared_memory.SharedMemory(create=True, size=size)
+        self.shared_board = board_views(self.memory.buf, layout)
+        # the memory's freed once the workers have stopped:
+        self.pool = WorkerPool(self.processes, start_worker, (lexicon, self.memory.name, layout), self.memory.unlink)
+
+    def moves_for_rows(self, rows, rack_tiles):
+        """ :param rows: list of rows of the board to play in, which are left unchanged
+        :param rack_tiles: list of the tiles available to play
+        :return: list of all the valid moves in the rows, scored, row by row in the given order
+        """
+        for name in GameBoard.ARRAYS:
+            self.shared_board[name][...] = getattr(self.board, name)
+
+        # deal the rows out in turn, so each worker gets a mix of busy and quiet ones:
+        specs = [(row.rank, row.direction.value) for row in rows]
+        results = self.pool.map(generate_for_rows, specs, rack_tiles)
+
+        moves = []
+        for i, row in enumerate(rows):
+            row = self.board.get_row(row.rank, row.direction)
+            for start_index, tiles, played_squares, score in results[i % self.processes][i // self.processes]:
+                move = Move(row, start_index, tiles, np.array(played_squares))
+                move.score = score
+                moves.append(move)
+        return moves
+
+    def close(self):
+        """ stops the worker processes and frees the shared memory """
+        self.shared_board = None
+        self.pool.close()
+        self.memory.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class MoveCache:
+    """ Remembers the moves found in each line of the board, so that after a move only the
+    lines it changed need searching again (least recently used lines are forgotten first).
+
+    Moves are remembered by everything about the line that decides them (its letters, hooks,
+    crosschecks, cross-word scores and multipliers) and by the rack. The board counts the
+    changes made to each line (see GameBoard.mark_changed), so a line's contents are only
+    read again once it has changed, and lines a move left alone are looked up straight away.
+
+    Only a search meeting the same racks over and over gains from it, as the endgame search does
+    (see EndgameSolver): from one turn of a game to the next, the rack has changed.
+
+    The remembered moves are handed out again as they are, so they mustn't be modified. """
+
+    # the parts of a line which decide the moves playable in it:
+    LINE_ARRAYS = ('existing_letters', 'hook_squares', 'this_row_crosschecks', 'this_row_cross_scores',
+                   'letter_multipliers', 'word_multipliers')
+
+    def __init__(self, board: GameBoard, max_size: int):
+        """ :param board: the board the lines belong to
+        :param max_size: the number of lines' moves to remember
+        """
+        self.board = board
+        self.max_size = max_size
+        self.moves = OrderedDict()
+        # each line's contents when last read, with the number of changes it had had by then:
+        self.lines = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def line_contents(self, row: Row):
+        """ :return: bytes holding everything about the row which decides the moves playable in it """
+        line = (row.direction.value, row.rank)
+        changes = self.board.line_changes[line]
+        known = self.lines.get(line)
+        if known is None or known[0] != changes:
+            known = self.lines[line] = (changes, b''.join(getattr(row, name).tobytes()
+                                                          for name in self.LINE_ARRAYS))
+        return known[1]
+
+    def moves_for_rows(self, rows, rack_tiles, generate):
+        """ :param rows: list of rows of the board to play in
+        :param rack_tiles: list of the tiles available to play
+        :param generate: function taking a list of rows and the rack tiles, and returning all the
+        moves in those rows, for the rows whose moves aren't remembered
+        :return: list of all the valid moves in the rows, row by row in the given order
+        """
+        rack = ''.join(sorted(rack_tiles))
+        keys = [(row.direction.value, row.rank, self.line_contents(row), rack) for row in rows]
+        found = {}
+        for key in keys:
+            if key in self.moves:
+                self.hits += 1
+                self.moves.move_to_end(key)
+                found[key] = self.moves[key]
+
+        missing = [row for row, key in zip(rows, keys) if key not in found]
+        if missing:
+            self.misses += len(missing)
+            moves_by_line = {(row.direction.value, row.rank): [] for row in missing}
+            for move in generate(missing, rack_tiles):
+                moves_by_line[move.row.direction.value, move.row.rank].append(move)
+            for key in keys:
+                if key not in found:
+                    found[key] = self.moves[key] = moves_by_line[key[:2]]
+            while len(self.moves) > self.max_size:
+                self.moves.popitem(last=False)
+                self.evictions += 1
+
+        return [move for key in keys for move in found[key]]
+
+    def stats(self):
+        """ :return: dictionary of the cache's counters, for tuning its size """
+        lookups = self.hits + self.misses
+        return {'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'size': len(self.moves),
+                'max_size': self.max_size,
+                'hit_rate': self.hits / lookups if lookups else 0.0}
+
+    def clear(self):
+        """ Forgets all remembered moves and resets the counters """
+        self.moves.clear()
+        self.lines.clear()
+        self.hits = self.misses = self.evictions = 0
@@ -1,9 +1,8 @@
 from model.board import GameBoard
-from model.config import Direction, RACK_SIZE, BOARD_SIZE, LETTER_DISTRIBUTIONS
-from model.lexicon import Lexicon
+from model.config import Direction, RACK_SIZE, BOARD_SIZE
+from model.lexicon import Gaddag, Lexicon
 from model.move import Move
 from model.row import Row
-from util.bit_twiddling import read_bit, clear_bit
 import numpy as np
 
 
@@ -56,17 +55,16 @@ class MoveValidator:
         if not self.has_valid_hook(row, move.played_squares):
             raise MoveValidationError("word must join an existing word or start square")
 
-        row.place_tiles(move.played_squares, move.tiles)
-
-        if not self.crosswords_valid(row):
-            row.remove_tiles(move.played_squares)
+        # the word along the row and every cross-word are looked up together (see Lexicon.contains_all):
+        words = self.words_formed(move)
+        words_found = self.lexicon.contains_all(words)
+        if not words_found[1:].all():
             raise MoveValidationError("invalid cross-word formed")
 
-        word_formed = row.word_at(start_index)
-        if word_formed not in self.lexicon:
-            row.remove_tiles(move.played_squares)
-            raise MoveValidationError("'" + word_formed + "'is not a valid word")
+        if not words_found[0]:
+            raise MoveValidationError("'" + words[0] + "'is not a valid word")
 
+        row.place_tiles(move.played_squares, move.tiles)
         move.calculate_score()
         move.is_valid = True
 
@@ -82,16 +80,16 @@ class MoveValidator:
         except MoveValidationError:
             return False
 
-    @staticmethod
-    def crosswords_valid(row: Row):
-        # ensure that for every letter now on the board in this row,
-        # the crosscheck bit in for that particular letter is not False
-        # (slice removes sentinel squares) - i.e. no letter in this word
-        # forms an invalid crossword in the orthogonal column.
-
-        return all([read_bit(letter_check[0], letter_check[1])
-                    for letter_check in np.column_stack(
-                (row.this_row_crosschecks[1:-1], row.existing_letters[1:-1]))])
+    def words_formed(self, move: Move):
+        """ :return: list of the words a standard move forms (whether or not it has been played yet):
+        the word along its row, then the cross-word through each tile that joins up with other letters """
+        words = [move.row.word_with_tiles(move.played_squares, move.tiles)]
+        for square, tile in zip(move.played_squares, move.tiles):
+            column = self.board.get_row(square, move.cross_direction())
+            left, right = column.fragments_around(move.row.rank)
+            if left or right:
+                words.append(left + tile.upper() + right)
+        return words
 
     def update_affected_squares(self, move: Move):
         """ Updates cached running totals and valid letters to play when making cross-words
@@ -104,11 +102,13 @@ class MoveValidator:
         # as a crossword score for the orthogonal columns crossing those blank squares
         move.row.update_hooks_and_running_scores(move.start_index)
         self.update_valid_letters(move.row, move.start_index)
+        self.board.mark_changed(move.row, self.squares_affected(move.row, move.start_index))
 
         for i in filled_squares:
             column = self.board.get_row(i, move.cross_direction())
             column.update_hooks_and_running_scores(move.row.rank)
             self.update_valid_letters(column, move.row.rank)
+            self.board.mark_changed(column, self.squares_affected(column, move.row.rank))
 
         # change multiplier for played squares to 1,
         # the identity for multiplication, so they aren't re-used
@@ -119,6 +119,13 @@ class MoveValidator:
         move.row.this_row_crosschecks[move.played_squares] = (1 << 32) - 1
         move.row.orthogonal_column_crosschecks[move.played_squares] = (1 << 32) - 1
 
+    @staticmethod
+    def squares_affected(row: Row, index: int):
+        """ :return: the squares of the word containing the given square, plus the hook squares
+        either side of it, whose cross-word scores and valid letters change when the word does """
+        squares = row.squares_in_word(index)
+        return np.arange(max(squares[0] - 1, 1), min(squares[-1] + 2, BOARD_SIZE))
+
     @staticmethod
     def has_valid_hook(row, played_squares):
         return any(row.hook_squares[played_squares])
@@ -134,9 +141,6 @@ class MoveValidator:
 
     def valid_letters_for_square(self, row: Row, index: int):
         valid_letters = (1 << 32) - 1
-        for i in range(1,len(LETTER_DISTRIBUTIONS)):
-            row.existing_letters[index] = i
-            if row.word_at(index) not in self.lexicon:
-                valid_letters = clear_bit(valid_letters, i)
-        row.existing_letters[index] = 0
-        return valid_letters
+        # clear the bits of all the letters which wouldn't join the words either side into a valid word:
+        left, right = row.fragments_around(index)
+        return (valid_letters & ~Gaddag.LETTERS) | self.lexicon.crosscheck_mask(left, right)
@@ -25,6 +25,18 @@ class Player:
         """
         raise NotImplementedError
 
+    def cancel(self):
+        """ Asks the player to submit its move straight away, rather than carry on deciding what to play.
+            Players which search for their moves play the best found so far; others ignore it.
+        """
+        pass
+
+    def close(self):
+        """ Called once the game is over, to release anything the player kept for the game
+            (such as worker processes). Players which keep nothing ignore it.
+        """
+        pass
+
     def notify_move_executed(self):
         """ Executed after the game controller indicates a move has been played
             (either by this player or an opponent), so that this player client knows
@@ -0,0 +1,53 @@
+from concurrent.futures import ProcessPoolExecutor
+import weakref
+
+
+def deal_out(items, count: int):
+    """ :return: list of up to count batches of the argument items, dealt out in turn like cards, so each
+    batch gets an even share of the items, and a mix of those early and late in the list (empty batches
+    are left out): the ith item is in batch i % count, at index i // count """
+    return [items[i::count] for i in range(count) if items[i::count]]
+
+
+def stop_workers(executor: ProcessPoolExecutor, cleanup=None):
+    """ stops a pool's worker processes, then calls the cleanup function, if there is one """
+    executor.shutdown()
+    if cleanup:
+        cleanup()
+
+
+class WorkerPool:
+    """ A pool of worker processes, which (unlike threads) run pure Python truly in parallel.
+
+    The workers are started once and kept until the pool is closed (or garbage collected). Each can be set up
+    by the initializer when it starts, which keeps whatever the worker needs (a move generator, say) in a
+    module level dictionary, so only the work itself is sent to the workers each time. """
+
+    def __init__(self, processes: int, initializer=None, initargs=(), cleanup=None):
+        """ :param processes: number of worker processes
+        :param initializer: Optional. Function called with the initargs in each worker as it starts
+        :param initargs: Optional. Tuple of arguments for the initializer, which must pickle
+        :param cleanup: Optional. Function called in this process once the workers have stopped
+        """
+        self.processes = processes
+        self.executor = ProcessPoolExecutor(processes, initializer=initializer, initargs=initargs)
+        # make sure the workers are stopped, even if close() is never called:
+        self.finalizer = weakref.finalize(self, stop_workers, self.executor, cleanup)
+
+    def map(self, function, items, *args):
+        """ shares the argument items out between the workers (see deal_out), calling function(batch, *args)
+        in each worker on its batch, with the same further arguments for every batch
+        :return: list of what each call returned, in the order of the batches
+        """
+        batches = deal_out(items, self.processes)
+        return list(self.executor.map(function, batches, *[[arg] * len(batches) for arg in args]))
+
+    def close(self):
+        """ stops the worker processes """
+        self.finalizer()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,219 @@
+from collections import Counter
+from math import comb, fsum
+import random
+import time
+
+import numpy as np
+
+from model.board import GameBoard
+from model.config import Direction, RACK_SIZE
+from model.endgame import EndgameSolver, tiles_value
+from model.leave import tiles_left
+from model.lexicon import Lexicon
+from model.move import Move
+from model.pool import WorkerPool
+from model.simulation import move_spec, unseen_tiles
+
+# state of a worker process of a PreEndgame, set up once when it starts:
+pre_endgame_state = {}
+
+
+def draws(tiles, count: int):
+    """ generates every different set of the given number of tiles that could be drawn from the argument tiles
+    :return: pairs of the tiles drawn (as a sorted tuple), and the number of ways of drawing them,
+    which sum to comb(len(tiles), count)
+    """
+    letters = sorted(Counter(tiles).items())
+
+    def draw(i, count):
+        if count == 0:
+            yield (), 1
+            return
+        if i == len(letters):
+            return
+        letter, available = letters[i]
+        for taken in range(min(available, count), -1, -1):
+            for rest, ways in draw(i + 1, count - taken):
+                yield (letter,) * taken + rest, comb(available, taken) * ways
+
+    yield from draw(0, count)
+
+
+def without(tiles, removed):
+    """ :return: sorted tuple of the argument tiles, less those removed """
+    left = Counter(tiles)
+    left.subtract(removed)
+    return tuple(sorted(left.elements()))
+
+
+def outcome(lead):
+    """ :return: 1 for a win by the argument lead, a half for a tie, 0 for a loss """
+    return 1.0 if lead > 0 else 0.5 if lead == 0 else 0.0
+
+
+def play_on(solver: EndgameSolver, racks, bag, mover: int, passed: bool, lead, ply: int):
+    """ plays the game on, both players playing their top scoring move, then once the bag's empty,
+    the rest of the game as EndgameSolver.greedy_value does, over every draw from the bag in turn
+    :param racks: pair of sorted tuples of the tiles on the player's rack (the first), and the opponent's
+    :param bag: sorted tuple of the tiles in the bag
+    :param lead: how far ahead the player is so far
+    :return: the chance the player wins, and how far ahead they finish on average
+    """
+    if not bag:
+        value = solver.greedy_value(racks, mover, passed, ply)
+        lead += value if mover == 0 else -value
+        return outcome(lead), lead
+
+    move = solver.top_move(racks[mover])
+    if move is None:
+        if passed:
+            lead += tiles_value(racks[1]) - tiles_value(racks[0])
+            return outcome(lead), lead
+        return play_on(solver, racks, bag, 1 - mover, True, lead, ply + 1)
+
+    solver.make(move, ply)
+    try:
+        return after_draws(solver, racks, tiles_left(racks[mover], move.tiles), bag, (), mover,
+                           lead + (move.score if mover == 0 else -move.score), ply + 1)
+    finally:
+        solver.unmake(ply)
+
+
+def after_draws(solver: EndgameSolver, racks, left, bag, returned, mover: int, lead, ply: int):
+    """ :param left: the tiles the mover kept, who then fills their rack back up from the bag
+    :param returned: tiles the mover exchanged, which go back in the bag after the draw
+    :return: as play_on, averaged over every draw the mover could make, by the number of ways of making it
+    """
+    wins, leads, total = [], [], 0
+    for drawn, ways in draws(bag, min(RACK_SIZE - len(left), len(bag))):
+        rack = tuple(sorted(list(left) + list(drawn)))
+        next_racks = (rack, racks[1]) if mover == 0 else (racks[0], rack)
+        win, final = play_on(solver, next_racks, tuple(sorted(without(bag, drawn) + tuple(returned))),
+                             1 - mover, False, lead, ply)
+        wins.append(ways * win)
+        leads.append(ways * final)
+        total += ways
+    return fsum(wins) / total, fsum(leads) / total
+
+
+def start_pre_endgame_worker(lexicon: Lexicon, state: dict = None):
+    """ sets up a worker process (or the argument state, to work in this process) with a board of its own,
+    and an endgame solver on it, whose caches are kept from one call to the next """
+    state = pre_endgame_state if state is None else state
+    state['board'] = GameBoard()
+    state['solver'] = EndgameSolver(lexicon, state['board'])
+
+
+def evaluate_scenarios(scenarios, arrays, rack_tiles, candidates, lead, time_limit: float, state: dict = None):
+    """ runs in a worker process (or in this one, given the state): plays out every candidate against
+    each of the argument scenarios in turn, until they're all done or time's up
+    :param scenarios: list of (opponent's rack, bag, number of ways of dealing them) triples
+    :return: list, one per scenario played out, of its number of ways and a list of
+    each candidate's chance of winning and mean finishing lead in it
+    """
+    state = pre_endgame_state if state is None else state
+    deadline = time.perf_counter() + time_limit
+    board, solver = state['board'], state['solver']
+    for name in GameBoard.ARRAYS:
+        np.copyto(getattr(board, name), arrays[name])
+    # every line's changed, as far as the solver's caches know:
+    board.line_changes += 1
+    board.refresh_bitboards()
+
+    results = []
+    for opponent_tiles, bag, ways in scenarios:
+        if results and time.perf_counter() >= deadline:
+            break
+        results.append((ways, [play_candidate(solver, rack_tiles, opponent_tiles, bag, candidate, lead)
+                               for candidate in candidates]))
+    return results
+
+
+def play_candidate(solver: EndgameSolver, rack_tiles, opponent_tiles, bag, candidate, lead):
+    """ :return: as play_on, with the candidate move (see move_spec) played first """
+    rank, direction, start_index, tiles, played_squares, score = candidate
+    racks = (tuple(sorted(rack_tiles)), tuple(sorted(opponent_tiles)))
+    if rank is None and not tiles:
+        return play_on(solver, racks, bag, 1, True, lead, 0)
+    if rank is None:
+        return after_draws(solver, racks, tiles_left(rack_tiles, tiles), bag, tiles, 0, lead, 0)
+
+    board = solver.board
+    move = Move(board.get_row(rank, Direction(direction)), start_index, tiles, np.array(played_squares))
+    move.score = score
+    solver.make(move, 0)
+    try:
+        return after_draws(solver, racks, tiles_left(rack_tiles, tiles), bag, (), 0, lead + score, 1)
+    finally:
+        solver.unmake(0)
+
+
+class PreEndgame:
+    """ Ranks candidate moves by their chance of winning when the bag's nearly empty: every way the
+    unseen tiles could be split between the opponent's rack and the bag is dealt in turn (with the
+    number of ways of dealing it), each candidate is played, and the game played out over every draw
+    from the bag, both players playing their top scoring move, and the endgame evaluated the same way
+    (see EndgameSolver.greedy_value).
+
+    Positions reached by more than one candidate or deal, and lines' moves, are worked out once and
+    remembered. The deals are shared out over a pool of worker processes, and taken in a random
+    order (fixed by the seed), so that when time runs out before they're all dealt, the chances
+    come from a fair sample of them. """
+
+    def __init__(self, lexicon: Lexicon, processes: int = 1):
+        """ :param lexicon: the lexicon, which must pickle by path (or be small), as Lexicon does
+        :param processes: Optional. Number of worker processes, or 1 to work in this process
+        """
+        self.processes = processes
+        if self.processes > 1:
+            self.pool = WorkerPool(self.processes, start_pre_endgame_worker, (lexicon,))
+            self.state = None
+        else:
+            self.pool = None
+            self.state = {}
+            start_pre_endgame_worker(lexicon, self.state)
+        # the deals in the last evaluation, and how many of them were played out in time:
+        self.scenarios = 0
+        self.evaluated = 0
+
+    def evaluate(self, board: GameBoard, rack_tiles, bag_size: int, candidates, lead, time_limit: float,
+                 seed: int = 0):
+        """ :param board: the board the candidates are played on, which is left unchanged
+        :param rack_tiles: the tiles on the player's rack
+        :param bag_size: the number of tiles in the bag (the rest of the unseen tiles are the opponent's)
+        :param candidates: list of the moves to compare (placements, exchanges or passes)
+        :param lead: how far ahead the player is
+        :param time_limit: seconds to play out deals for
+        :param seed: Optional. Seed for the order the deals are taken in
+        :return: list of each candidate's chance of winning and mean finishing lead
+        """
+        arrays = {name: getattr(board, name).copy() for name in GameBoard.ARRAYS}
+        unseen = unseen_tiles(board, rack_tiles)
+        specs = [move_spec(move) for move in candidates]
+        scenarios = [(opponent_tiles, without(unseen, opponent_tiles), ways)
+                     for opponent_tiles, ways in draws(unseen, len(unseen) - bag_size)]
+        random.Random(seed).shuffle(scenarios)
+
+        if self.pool:
+            results = [result for batch in self.pool.map(evaluate_scenarios, scenarios, arrays, rack_tiles, specs,
+                                                         lead, time_limit)
+                       for result in batch]
+        else:
+            results = evaluate_scenarios(scenarios, arrays, rack_tiles, specs, lead, time_limit, self.state)
+
+        self.scenarios = len(scenarios)
+        self.evaluated = len(results)
+        total = sum(ways for ways, outcomes in results)
+        return [(fsum(ways * outcomes[i][0] for ways, outcomes in results) / total,
+                 fsum(ways * outcomes[i][1] for ways, outcomes in results) / total) for i in range(len(specs))]
+
+    def close(self):
+        """ stops the worker processes """
+        if self.pool:
+            self.pool.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -1,3 +1,5 @@
+import copy
+
 import numpy as np
 from model.config import Direction, BOARD_SIZE
 
@@ -10,10 +12,14 @@ class Row:
     it is oriented horizontally or vertically on the game board),
     and 'column' refers to the row orthogonal to this one"""
 
-    def __init__(self, direction: Direction, rank: int, row_data):
-        """ creates a row slice of the game board """
+    def __init__(self, direction: Direction, rank: int, row_data, board=None):
+        """ creates a row slice of the game board
+        :param board: Optional. The board the row belongs to, whose bitboards and hash are
+        kept up to date as tiles are placed in the row (see GameBoard.refresh_bitboards)
+        """
         self.direction = direction
         self.rank = rank
+        self.board = board
         self.hook_squares = row_data[0]
         self.word_multipliers = row_data[1]
         self.letter_multipliers = row_data[2]
@@ -24,6 +30,15 @@ class Row:
         self.orthogonal_column_crosschecks = row_data[7]
         self.orthogonal_column_cross_scores = row_data[8]
 
+    def __deepcopy__(self, memo):
+        """ copies the row's arrays, but not the board: the copy's squares are its own, so placing tiles
+        in it mustn't change the board's bitboards and hash """
+        copied = Row.__new__(Row)
+        memo[id(self)] = copied
+        for name, value in self.__dict__.items():
+            setattr(copied, name, None if name == 'board' else copy.deepcopy(value, memo))
+        return copied
+
     def square_is_empty(self, index_of_square):
         return not self.existing_letters[index_of_square]
 
@@ -57,6 +72,31 @@ class Row:
     def word_at(self, index):
         return ''.join([chr(i + 64) for i in self.existing_letters[self.squares_in_word(index)]])
 
+    def fragments_around(self, index):
+        """ :return: the strings of letters immediately before and after the square at the given index,
+        i.e. the two parts of the word that a tile placed there would join up """
+        start_square = index
+        while self.existing_letters[start_square - 1] > 0:  # sentinel squares are negative
+            start_square -= 1
+        end_square = index + 1
+        while self.existing_letters[end_square] > 0:
+            end_square += 1
+        return (''.join([chr(i + 64) for i in self.existing_letters[start_square:index]]),
+                ''.join([chr(i + 64) for i in self.existing_letters[index + 1:end_square]]))
+
+    def word_with_tiles(self, played_squares, tiles):
+        """ :return: the word this row would hold around the given squares if the given tiles were
+        placed in them, without placing them """
+        letters = np.copy(self.existing_letters)
+        np.put(letters, played_squares, [(ord(t) - 64) for t in tiles])
+        start_square = played_squares[0]
+        while letters[start_square - 1] > 0:  # sentinel squares are negative
+            start_square -= 1
+        end_square = played_squares[-1] + 1
+        while letters[end_square] > 0:
+            end_square += 1
+        return ''.join([chr(i + 64) for i in letters[start_square:end_square]])
+
     def update_hooks_and_running_scores(self, index):
         """ updates the empty squares at either end of whichever word contains the letter at the supplied index.
         Calculates running scores and valid letters and caches them in these squares """
@@ -81,8 +121,15 @@ class Row:
     def place_tiles(self, played_squares, tiles):
         tile_ordinals = [(ord(t)-64) for t in tiles]
         np.put(self.existing_letters, played_squares, tile_ordinals)
+        if self.board is not None:
+            for index, code in zip(np.ravel(played_squares).tolist(), tile_ordinals):
+                self.board.toggle_tile(self.board.square_number(self, index), code)
 
     def remove_tiles(self, played_squares):
+        if self.board is not None:
+            for index in np.ravel(played_squares).tolist():
+                if self.existing_letters[index] > 0:
+                    self.board.toggle_tile(self.board.square_number(self, index), int(self.existing_letters[index]))
         self.existing_letters[played_squares] = 0
 
     def __str__(self):
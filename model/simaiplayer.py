@@ -0,0 +1,62 @@
+from controller.game import GameController
+from model.aiplayer import AiPlayer
+from model.inference import RackInference
+from model.move import Move
+from model.simulation import Simulator
+from view.view import View
+
+
+class SimAiPlayer(AiPlayer):
+    """ represents a AI-controlled player choosing between its best few moves by simulating how the game might go on """
+
+    def __init__(self, game: GameController, gui: View, name: str, candidates: int = 10, iterations: int = 100,
+                 plies: int = 3, processes: int = 1, seed: int = 0, inference: bool = False):
+        """ Create a new simulating AI player
+        :param candidates: Optional. Number of moves, best equity first, to simulate
+        :param iterations: Optional. Number of opponent's racks to play every candidate out against each turn
+        :param plies: Optional. Number of moves to play out, counting the candidate (2 to 4 is usual)
+        :param processes: Optional. Number of worker processes to share the iterations (1 to simulate in this one)
+        :param seed: Optional. Seed for the simulations, which (with the turn number) fixes each turn's choice
+        :param inference: Optional. Deal the opponent racks holding the tiles they're likely to have kept, judging
+        by the move they've just made (see RackInference), rather than any of the unseen tiles at random
+        """
+        super().__init__(game, gui, name, equity=True)
+        self.candidates = candidates
+        self.iterations = iterations
+        self.plies = plies
+        self.seed = seed
+        self.simulator = Simulator(game.lexicon, processes)
+        self.inference = RackInference(self.leave_table, seed=seed, lexicon=game.lexicon) if inference else None
+        # the number of the last move inferred from:
+        self.moves_observed = 0
+
+    def best_move(self, potential_moves):
+        """ returns whichever of the best equity moves does best in simulation """
+        # once the bag's empty, both racks are known, and there's nothing to draw to simulate:
+        if not self.game.bag.remaining_tiles() or len(potential_moves) < 2:
+            return super().best_move(potential_moves)
+
+        potential_moves.sort(key=self.move_equity, reverse=True)
+        candidates = potential_moves[:self.candidates]
+        leaves, weights = (self.inference.leaves, self.inference.weights) if self.inference else (None, None)
+        results = self.simulator.evaluate(self.board, self.rack.rack_tiles, candidates, self.iterations,
+                                          self.plies, self.seed + self.game.move_number, leaves, weights)
+        # the first found of the best, if there's a tie:
+        best = max(range(len(candidates)), key=lambda i: results[i])
+
+        return super().best_move([candidates[best]])
+
+    def close(self):
+        super().close()
+        self.simulator.close()
+
+    def notify_move_executed(self):
+        super().notify_move_executed()
+        if not self.inference:
+            return
+        # weigh up what the opponent kept after each of their moves (only the number of tiles exchanged is known):
+        for number in range(self.moves_observed + 1, self.game.move_number + 1):
+            name, rack, word, move = self.game.record_of_moves[number]
+            if name != self.name and isinstance(move, Move):
+                self.inference.observe(self.board, self.rack.rack_tiles, move, self.game.bag.remaining_tiles())
+        self.moves_observed = self.game.move_number
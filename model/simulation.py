@@ -0,0 +1,217 @@
+from math import fsum
+import random
+import time
+
+import numpy as np
+
+from model.board import GameBoard
+from model.config import BOARD_SIZE, Direction, LETTER_DISTRIBUTIONS, RACK_SIZE
+from model.leave import get_leave_table, leave_value, tiles_left
+from model.lexicon import Lexicon
+from model.move import Move
+from model.movegenerator import MoveGenerator
+from model.movevalidator import MoveValidator
+from model.pool import WorkerPool
+
+# state of a worker process of a Simulator, set up once when it starts:
+simulation_state = {}
+
+
+def unseen_tiles(board: GameBoard, rack_tiles):
+    """ :return: list of the tiles a player can't see: every tile, less those on the board
+    and on the player's rack (so the tiles in the bag and on the other players' racks) """
+    counts = list(LETTER_DISTRIBUTIONS)
+    for letter in board.existing_letters[1:BOARD_SIZE, 1:BOARD_SIZE].ravel().tolist():
+        if letter > 0:
+            counts[0 if letter > 26 else letter] -= 1  # blanks are held as lowercase letters
+    for tile in rack_tiles:
+        counts[0 if tile == '@' or tile.islower() else ord(tile) - 64] -= 1
+    return [chr(64 + ordinal) for ordinal, count in enumerate(counts) for i in range(count)]
+
+
+def deal(rng: random.Random, unseen, leaves=None, weights=None, rack_size: int = RACK_SIZE):
+    """ deals the opponent a rack from the tiles the player can't see, at random, or as a leave
+    they're likely to have kept (see inference.RackInference) filled up at random
+    :param rng: random number generator to deal with
+    :param unseen: list of the tiles the player can't see (the opponent's and the bag's)
+    :param leaves: Optional. List of the leaves (as strings of tiles) the opponent might have kept
+    :param weights: Optional. List of the chance of each leave
+    :param rack_size: Optional. The number of tiles on the opponent's rack
+    :return: list of the tiles on the opponent's rack, and list of the rest of the unseen tiles, shuffled
+    """
+    tiles = list(unseen)
+    rng.shuffle(tiles)
+    leave = []
+    if leaves:
+        # (less any tiles seen since, e.g. drawn by the player)
+        for tile in rng.choices(leaves, weights)[0]:
+            if tile in tiles:
+                tiles.remove(tile)
+                leave.append(tile)
+    drawn = rack_size - len(leave)
+    return leave + tiles[:drawn], tiles[drawn:]
+
+
+def move_spec(move: Move):
+    """ :return: the argument move as a plain tuple of (rank, direction value, start index, tiles,
+    played squares, score), which pickles small and can be rebuilt against another board """
+    if move.direction == Direction.NOT_APPLICABLE:
+        return None, None, None, list(move.tiles or []), None, 0
+    return move.row.rank, move.direction.value, move.start_index, list(move.tiles), \
+        move.played_squares.tolist(), float(move.score)
+
+
+def start_simulation_worker(lexicon: Lexicon, state: dict = None):
+    """ sets up a worker process (or the argument state, to simulate in this process): readies a move
+    generator, and the leave values moves are chosen with (the lexicon arrives pickled by path,
+    so the worker maps the same index file rather than copying it) """
+    state = simulation_state if state is None else state
+    state['lexicon'] = lexicon
+    state['generator'] = MoveGenerator(lexicon)
+    leave_table = get_leave_table()
+    state['leave_worth'] = leave_table.value if leave_table else leave_value
+
+
+def best_reply(state: dict, board: GameBoard, rack_tiles, bag_size: int):
+    """ :return: the placement with the best equity (see AiPlayer.move_equity) for the rack, or None if there's none """
+    rows = board.hooked_rows()
+    leave_worth = state['leave_worth']
+    best, best_equity = None, None
+    for move in state['generator'].iter_moves(rows, rack_tiles):
+        equity = move.score + (leave_worth(tiles_left(rack_tiles, move.tiles)) if bag_size else 0)
+        if best is None or equity > best_equity:
+            best, best_equity = move, equity
+    return best
+
+
+def play_out(state: dict, arrays, rack_tiles, opponent_tiles, bag, candidate, plies: int):
+    """ plays the candidate move on a copy of the board, then the best replies in turn, each player
+    drawing from the bag after moving
+    :return: the points the player gains on the opponent over the plies, plus the difference
+    in the worth of the tiles the two are left holding (while the bag holds any tiles) """
+    board = GameBoard.from_arrays({name: array.copy() for name, array in arrays.items()})
+    validator = MoveValidator(state['lexicon'], board)
+    bag = list(bag)
+    racks = [tiles_left(rack_tiles, candidate[3]), list(opponent_tiles)]
+
+    rank, direction, start_index, tiles, played_squares, score = candidate
+    spread = score
+    if rank is not None:
+        move = Move(board.get_row(rank, Direction(direction)), start_index, tiles, np.array(played_squares))
+        validator.is_valid(move)
+        validator.update_affected_squares(move)
+    drawn = RACK_SIZE - len(racks[0])
+    racks[0].extend(bag[:drawn])
+    del bag[:drawn]
+    # exchanged tiles go back in the bag once the new ones have been drawn:
+    if rank is None:
+        bag.extend(tiles)
+
+    mover = 1
+    for ply in range(1, plies):
+        if not racks[0] or not racks[1]:
+            break  # the game's over
+        move = best_reply(state, board, racks[mover], len(bag))
+        if move:
+            validator.is_valid(move)
+            validator.update_affected_squares(move)
+            spread += move.score if mover == 0 else -move.score
+            racks[mover] = tiles_left(racks[mover], move.tiles)
+            drawn = RACK_SIZE - len(racks[mover])
+            racks[mover].extend(bag[:drawn])
+            del bag[:drawn]
+        mover = 1 - mover
+
+    if bag:
+        spread += state['leave_worth'](racks[0]) - state['leave_worth'](racks[1])
+    return spread
+
+
+def simulate(seeds, arrays, rack_tiles, unseen, candidates, plies: int, leaves=None, weights=None,
+             state: dict = None):
+    """ runs in a worker process (or in this one, given the state): plays out every candidate once
+    for each of the argument seeds, each seed dealing the opponent's rack from the unseen tiles
+    (see deal, given the leaves they might have kept and their chances), and the order of the rest in the bag
+
+    :return: list, one per seed, of lists of each candidate's result (see play_out)
+    """
+    state = simulation_state if state is None else state
+    results = []
+    for seed in seeds:
+        opponent_tiles, bag = deal(random.Random(seed), unseen, leaves, weights)
+        # every candidate meets the same opponent's rack and bag, so they're compared on equal terms:
+        results.append([play_out(state, arrays, rack_tiles, opponent_tiles, bag, candidate, plies)
+                        for candidate in candidates])
+    return results
+
+
+class Simulator:
+    """ Ranks candidate moves by Monte Carlo simulation: each iteration deals the opponent a rack
+    from the tiles the player can't see, and plays each candidate out for a few plies, both sides
+    then playing their best equity move, to see how far ahead the candidate leaves the player.
+
+    Iterations are spread over a pool of worker processes, started once and kept. Each iteration's
+    random draws come from its own seed, and results are summed exactly (math.fsum), so the ranking
+    is the same for a given seed however many processes share the work. """
+
+    def __init__(self, lexicon: Lexicon, processes: int = 1):
+        """ :param lexicon: the lexicon, which must pickle by path (or be small), as Lexicon does
+        :param processes: Optional. Number of worker processes, or 1 to simulate in this process
+        """
+        self.processes = processes
+        if processes > 1:
+            self.pool = WorkerPool(processes, start_simulation_worker, (lexicon,))
+            self.state = None
+        else:
+            self.pool = None
+            self.state = {}
+            start_simulation_worker(lexicon, self.state)
+        # iterations run, and the seconds they took, for reporting throughput:
+        self.iterations = 0
+        self.seconds = 0.0
+
+    def evaluate(self, board: GameBoard, rack_tiles, candidates, iterations: int, plies: int, seed: int,
+                 leaves=None, weights=None):
+        """ :param board: the board the candidates are played on, which is left unchanged
+        :param rack_tiles: the tiles on the player's rack
+        :param candidates: list of the moves to compare (placements, exchanges or passes)
+        :param iterations: number of opponent's racks to play every candidate out against
+        :param plies: number of moves to play out, counting the candidate (2 to 4 is usual)
+        :param seed: seed for the random draws, which fixes the result
+        :param leaves: Optional. List of the leaves the opponent might have kept (see inference.RackInference)
+        :param weights: Optional. List of the chance of each leave
+        :return: list of each candidate's mean result (see play_out)
+        """
+        start = time.perf_counter()
+        arrays = {name: getattr(board, name).copy() for name in GameBoard.ARRAYS}
+        unseen = unseen_tiles(board, rack_tiles)
+        specs = [move_spec(move) for move in candidates]
+        rng = random.Random(seed)
+        seeds = [rng.getrandbits(64) for i in range(iterations)]
+
+        if self.pool:
+            results = [result for batch in self.pool.map(simulate, seeds, arrays, rack_tiles, unseen, specs, plies,
+                                                         leaves, weights)
+                       for result in batch]
+        else:
+            results = simulate(seeds, arrays, rack_tiles, unseen, specs, plies, leaves, weights, self.state)
+
+        self.iterations += iterations
+        self.seconds += time.perf_counter() - start
+        return [fsum(result[i] for result in results) / len(results) for i in range(len(specs))]
+
+    def iterations_per_second(self):
+        """ :return: iterations run per second so far, and per second per process """
+        rate = self.iterations / self.seconds if self.seconds else 0.0
+        return rate, rate / self.processes
+
+    def close(self):
+        """ stops the worker processes """
+        if self.pool:
+            self.pool.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -1,7 +1,13 @@
+import pytest
+
 from controller.game import GameController, GameState
+from model.aiplayer import AiPlayer
+from model.lexicon import Lexicon, register_lexicon, shared_lexicon
+import model.lexicon as lexicon_module
 from model.bag import Bag
 from model.humanplayer import HumanPlayer
 from view.consolegui import ConsoleGui
+from view.view import View
 
 def test_init():
     players = [None, None]
@@ -55,3 +61,53 @@ def test_adjust_final_scores():
 
 def test_clean_up_invalid_move():
     pass
+
+def unwrapped(lexicon):
+    # games may wrap the lexicon in a cache:
+    return getattr(lexicon, 'lexicon', lexicon)
+
+def test_games_share_one_lexicon():
+    game1 = GameController([None, None], Bag())
+    game2 = GameController([None, None], Bag())
+    assert unwrapped(game1.lexicon) is unwrapped(game2.lexicon)
+    assert game1.validator.lexicon is game1.lexicon
+
+def test_lexicon_injected():
+    lexicon = shared_lexicon()
+    game = GameController([None, None], Bag(), lexicon)
+    assert unwrapped(game.lexicon) is lexicon
+
+def test_lexicon_selected_by_name(tmp_path, monkeypatch):
+    # registered (and loaded) for this test only, as the file goes with tmp_path:
+    monkeypatch.setattr(lexicon_module, 'registered_lexicons', dict(lexicon_module.registered_lexicons))
+    monkeypatch.setattr(lexicon_module, 'shared_lexicons', dict(lexicon_module.shared_lexicons))
+    path = str(tmp_path / 'small.lex')
+    Lexicon.from_words(['CAT', 'DOG']).save(path)
+    register_lexicon('small', path)
+    game1 = GameController([None, None], Bag(), 'SMALL')
+    game2 = GameController([None, None], Bag(), 'small')
+    assert unwrapped(game1.lexicon) is unwrapped(game2.lexicon)
+    assert 'DOG' in game1.lexicon
+    assert 'CATS' not in game1.lexicon
+
+
+class QuittingPlayer(HumanPlayer):
+    """ a player who gives the game up as soon as it's their turn """
+
+    def get_starting_move(self):
+        raise KeyboardInterrupt
+
+    def get_move(self):
+        raise KeyboardInterrupt
+
+
+def test_players_closed_when_game_over():
+
+    bag = Bag()
+    game = GameController([None, None], bag)
+    ai_player = AiPlayer(game, View(game), "AI Player", pre_endgame_time=1, processes=2)
+    game.players = [QuittingPlayer(bag, ConsoleGui(game), "Quitter"), ai_player]
+    with pytest.raises(KeyboardInterrupt):
+        game.start_game()
+    # however the game ended, the players' worker processes are stopped:
+    assert not ai_player.pre_endgame.pool.finalizer.alive
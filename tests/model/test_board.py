@@ -0,0 +1,93 @@
+import copy
+
+from model.board import GameBoard
+from model.config import Direction
+from model.lexicon import get_lexicon
+from model.move import Move
+from model.movevalidator import MoveValidator
+
+
+def play(board, validator, rank, direction, start_index, tiles):
+    move = Move(board.get_row(rank, direction), start_index, list(tiles))
+    validator.is_valid(move)
+    validator.update_affected_squares(move)
+    return move
+
+
+def test_bitboards_follow_placements():
+    board = GameBoard()
+    validator = MoveValidator(get_lexicon(), board)
+    play(board, validator, 8, Direction.HORIZONTAL, 7, 'CAT')
+    play(board, validator, 7, Direction.VERTICAL, 6, 'aR')
+
+    assert bin(board.occupied).count('1') == 5
+    assert board.letter_boards[1] == 1 << GameBoard.square_number(board.get_row(8, Direction.HORIZONTAL), 8) | \
+        1 << GameBoard.square_number(board.get_row(7, Direction.VERTICAL), 6)
+    assert board.letter_boards[0] == 1 << (6 * 17 + 7)  # the blank, played as an A
+
+    # worked out incrementally, just as from scratch:
+    occupied, letter_boards, zobrist = board.occupied, list(board.letter_boards), board.zobrist
+    board.refresh_bitboards()
+    assert (board.occupied, board.letter_boards, board.zobrist) == (occupied, letter_boards, zobrist)
+
+    # and taking tiles away again puts the hash back:
+    row = board.get_row(7, Direction.VERTICAL)
+    row.remove_tiles([6, 7])
+    assert board.zobrist != zobrist
+    row.place_tiles([6, 7], ['a', 'R'])
+    assert board.zobrist == zobrist
+
+
+
+def test_deep_copied_row_leaves_board_alone():
+    board = GameBoard()
+    validator = MoveValidator(get_lexicon(), board)
+    play(board, validator, 8, Direction.HORIZONTAL, 7, 'CAT')
+    occupied, zobrist = board.occupied, board.zobrist
+
+    # a copy of a row has squares of its own, so tiles placed in it aren't on the board:
+    row = copy.deepcopy(board.get_row(9, Direction.HORIZONTAL))
+    assert row.board is None
+    row.place_tiles([7, 8], ['A', 'X'])
+    assert (board.occupied, board.zobrist) == (occupied, zobrist)
+    assert not board.existing_letters[9, 7]
+
+
+
+def test_hooked_rows():
+    board = GameBoard()
+    # only the centre square's row and column can be played in to start with:
+    assert [(row.direction, row.rank) for row in board.hooked_rows()] == \
+        [(Direction.HORIZONTAL, 8), (Direction.VERTICAL, 8)]
+    play(board, MoveValidator(get_lexicon(), board), 8, Direction.HORIZONTAL, 7, 'CAT')
+    rows = board.hooked_rows()
+    assert [row.rank for row in rows if row.direction == Direction.HORIZONTAL] == [7, 8, 9]
+    assert [row.rank for row in rows if row.direction == Direction.VERTICAL] == [6, 7, 8, 9, 10]
+
+
+def test_zobrist_hash_ignores_order_of_play():
+    first, second = GameBoard(), GameBoard()
+    first_validator, second_validator = MoveValidator(get_lexicon(), first), MoveValidator(get_lexicon(), second)
+    play(first, first_validator, 8, Direction.HORIZONTAL, 7, 'CAT')
+    play(first, first_validator, 8, Direction.HORIZONTAL, 10, 'S')
+    play(first, first_validator, 7, Direction.VERTICAL, 6, 'AR')
+    play(second, second_validator, 8, Direction.HORIZONTAL, 7, 'CAT')
+    play(second, second_validator, 7, Direction.VERTICAL, 6, 'AR')
+    assert first.zobrist != second.zobrist
+    play(second, second_validator, 8, Direction.HORIZONTAL, 10, 'S')
+    assert first.zobrist == second.zobrist
+
+    # a board made from another's arrays hashes the same, and a blank differently from the tile it stands for:
+    assert GameBoard.from_arrays({name: getattr(second, name) for name in GameBoard.ARRAYS}).zobrist == second.zobrist
+    third, fourth = GameBoard(), GameBoard()
+    play(third, MoveValidator(get_lexicon(), third), 8, Direction.HORIZONTAL, 7, 'cAT')
+    play(fourth, MoveValidator(get_lexicon(), fourth), 8, Direction.HORIZONTAL, 7, 'CAT')
+    assert third.zobrist != fourth.zobrist
+
+
+def test_move_hash_matches_equality():
+    board = GameBoard()
+    row = board.get_row(8, Direction.HORIZONTAL)
+    assert hash(Move(row, 7, list('CAT'))) == hash(Move(board.get_row(8, Direction.HORIZONTAL), 7, list('CAT')))
+    assert len({Move(row, 7, list('CAT')), Move(row, 7, list('CAT')), Move(row, 6, list('CAT')),
+                Move(None, None, []), Move(None, None, [])}) == 3
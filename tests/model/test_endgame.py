@@ -0,0 +1,80 @@
+from controller.game import GameController
+from model.aiplayer import AiPlayer
+from model.bag import Bag
+from model.config import Direction
+from model.endgame import EndgameSolver, tiles_value
+from model.move import Move
+from view.view import View
+
+
+def setup():
+    game = GameController([None, None], Bag())
+    move = Move(game.board.get_row(8, Direction.HORIZONTAL), 7, list('CAT'))
+    game.validator.is_valid(move)
+    game.validator.update_affected_squares(move)
+    return game
+
+
+def test_tiles_value():
+    assert tiles_value('QI@') == 11
+    assert tiles_value([]) == 0
+
+
+def test_endgame_solved_and_board_restored():
+    game = setup()
+    solver = EndgameSolver(game.lexicon, game.board)
+    arrays = {name: getattr(game.board, name).copy() for name in game.board.ARRAYS}
+    zobrist = game.board.zobrist
+
+    move, value = solver.best_move(['S'], ['Q', 'Z'], 30)
+    assert solver.solved
+    # playing out straight away wins the opponent's tiles, and nothing they could do beats it:
+    assert move.tiles == ['S']
+    assert value == move.score + 2 * 20
+    assert all((getattr(game.board, name) == array).all() for name, array in arrays.items())
+
+    # with nothing to play, all there is to do is pass, and let the opponent play out:
+    move, value = solver.best_move(['Q'], ['Z'], 30)
+    assert solver.solved
+    assert not move.tiles
+    assert value < -2 * 10
+    assert all((getattr(game.board, name) == array).all() for name, array in arrays.items())
+    assert game.board.zobrist == zobrist
+
+
+def test_endgame_search_stops_when_asked():
+    game = setup()
+    solver = EndgameSolver(game.lexicon, game.board)
+    move, value = solver.best_move(list('ERSOUTA'), list('DEGPRRT'), 30, stop=lambda: True)
+    assert not solver.solved
+    # stopped before any search finished, the top scoring move is played, rather than passing:
+    assert move.tiles
+    assert move.score == solver.top_move(tuple(sorted('ERSOUTA'))).score
+
+
+def test_ai_player_solves_endgame(monkeypatch):
+    game = setup()
+    player = AiPlayer(game, View(game), "AI Player 1", endgame_time=30)
+    game.players = [player, AiPlayer(game, View(game), "AI Player 2")]
+    game.bag.bag_tiles = []
+    # the tiles the player can't see, which in a real endgame would all be on the opponent's rack:
+    monkeypatch.setattr('model.aiplayer.unseen_tiles', lambda board, rack_tiles: ['Q', 'Z'])
+    player.rack.rack_tiles = ['S']
+    move = player.get_move()
+    assert move.tiles == ['S']
+    assert player.endgame_solver.solved
+    assert not player.rack.rack_tiles
+
+
+def test_endgame_tables_capped(monkeypatch):
+    game = setup()
+    expected_move, expected_value = EndgameSolver(game.lexicon, game.board).best_move(['S', 'Q'], ['Z', 'E'], 30)
+
+    monkeypatch.setattr('model.endgame.ENDGAME_TABLE_SIZE', 1)
+    solver = EndgameSolver(game.lexicon, game.board)
+    move, value = solver.best_move(['S', 'Q'], ['Z', 'E'], 30)
+    assert solver.solved
+    assert len(solver.table) == len(solver.greedy_values) == 1
+    # forgetting positions costs time, not the answer:
+    assert value == expected_value
+    assert str(move) == str(expected_move)
@@ -0,0 +1,70 @@
+import random
+
+from controller.game import GameController
+from model.bag import Bag
+from model.config import Direction
+from model.inference import RackInference
+from model.leave import leave_value
+from model.move import Move
+from model.simulation import unseen_tiles
+
+
+def setup():
+    game = GameController([None, None], Bag())
+    move = Move(game.board.get_row(8, Direction.HORIZONTAL), 7, list('CAT'))
+    game.validator.is_valid(move)
+    game.validator.update_affected_squares(move)
+    return game, move
+
+
+def test_inference_from_placement():
+    game, move = setup()
+    rack_tiles = list('ERSOUTA')
+    uninformed = RackInference(rationality=0, samples=2000)
+    uninformed.observe(game.board, rack_tiles, move, 83)
+    inference = RackInference(samples=2000)
+    inference.observe(game.board, rack_tiles, move, 83)
+
+    leaves = inference.distribution()
+    assert all(len(leave) == 4 for leave, chance in leaves)
+    assert abs(sum(chance for leave, chance in leaves) - 1) < 1e-9
+    assert leaves[0][1] >= leaves[-1][1]
+    # the same leaves are drawn, but the opponent's more likely to have kept good tiles,
+    # having played so few points rather than exchange:
+    assert sum(chance * leave_value(leave) for leave, chance in leaves) > \
+        sum(chance * leave_value(leave) for leave, chance in uninformed.distribution())
+
+    unseen = unseen_tiles(game.board, rack_tiles)
+    opponent_tiles, bag = inference.sample_rack(random.Random(1), unseen)
+    assert len(opponent_tiles) == 7
+    assert sorted(opponent_tiles + bag) == sorted(unseen)
+
+
+def test_inference_from_exchange_and_pass():
+    game, move = setup()
+    inference = RackInference(samples=500)
+    inference.observe(game.board, list('ERSOUTA'), Move(None, None, list('XYZ')), 83)
+    leaves = inference.distribution()
+    assert all(len(leave) == 4 for leave, chance in leaves)
+
+    # passing says nothing new, so the leaves stand:
+    inference.observe(game.board, list('ERSOUTA'), Move(None, None, []), 83)
+    assert inference.distribution() == leaves
+
+
+def test_inference_from_placement_weighs_racks_that_could_play_out():
+    game, move = setup()
+    rack_tiles = list('ERSOUTA')
+    blind = RackInference(samples=4000)
+    blind.observe(game.board, rack_tiles, move, 83)
+    inference = RackInference(samples=4000, lexicon=game.lexicon)
+    inference.observe(game.board, rack_tiles, move, 83)
+
+    def chance_of_playing_out(leaves):
+        return sum(chance for leave, chance in leaves if '@' not in leave and
+                   game.lexicon.anagram_index.words_for(''.join(sorted(leave + 'CAT')).encode()))
+
+    # the same leaves are drawn, but with CAT, some spell a seven letter word (e.g. IONS, for ACTIONS),
+    # which would have scored far more than CAT did, so they're far less likely:
+    assert chance_of_playing_out(blind.distribution()) > 0
+    assert chance_of_playing_out(inference.distribution()) < chance_of_playing_out(blind.distribution()) / 10
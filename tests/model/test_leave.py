@@ -0,0 +1,73 @@
+from controller.game import GameController
+from model.aiplayer import AiPlayer
+from model.bag import Bag
+from model.leave import LeaveTable, SIZE_OFFSETS, all_leaves, leave_index, leave_value, leaves
+from view.view import View
+
+
+def test_leaves_skip_duplicates():
+    assert len(list(leaves('ABCDEFG'))) == 128
+    assert len(list(leaves('AAEE'))) == 9
+    assert len(list(leaves('@@@'))) == 4
+    for kept, exchanged in leaves('AAEEQ'):
+        assert sorted(kept + exchanged) == sorted('AAEEQ')
+
+
+def test_leave_value():
+    assert leave_value('S@') > leave_value('SE') > leave_value('UQ')
+    assert leave_value('E') > leave_value('EE')
+    assert leave_value('') == 0
+
+
+def test_exchange_only_offered_when_nothing_scores():
+    game = GameController([None, None], Bag())
+    player = AiPlayer(game, View(game), "AI Player 1")
+
+    player.rack.rack_tiles = list('AEINRST')
+    moves = player.generate_all_moves()
+    assert [str(move) for move in moves if not move.row] == ['Move: pass']
+
+    player.rack.rack_tiles = list('QQVVWWS')
+    moves = player.generate_all_moves()
+    assert [str(move) for move in moves] == ['Move: Exchange QQVVWW', 'Move: pass']
+    assert str(player.best_move(moves)) == 'Move: Exchange QQVVWW'
+
+
+def test_leave_numbers():
+    assert leave_index('') == 0
+    assert leave_index('@') == 1
+    assert leave_index('QI') == leave_index('IQ')
+    assert leave_index('@I') == leave_index('qI')
+    assert leave_index('ZZZZZZZ') == SIZE_OFFSETS[8] - 1
+    # every leave of a size gets its own number, in that size's range:
+    ordinals, indexes = all_leaves(3)
+    assert sorted(indexes) == list(range(SIZE_OFFSETS[3], SIZE_OFFSETS[4]))
+    for tiles, index in zip(ordinals[::997], indexes[::997]):
+        assert leave_index([chr(64 + ordinal) if ordinal else '@' for ordinal in tiles]) == index
+
+
+def test_leave_table(tmp_path):
+    table = LeaveTable.from_leave_values()
+    for tiles in ('', 'S@', 'EEE', 'UQVVWW', 'AEINRST', 'AEIOU@@'):
+        assert abs(table.value(tiles) - leave_value(tiles)) < 1e-4
+
+    table.values[leave_index('QU')] = 5
+    table.save(str(tmp_path / 'leaves.npy'))
+    loaded = LeaveTable.load(str(tmp_path / 'leaves.npy'))
+    assert loaded.value('UQ') == 5
+    assert abs(loaded.value('S@') - leave_value('S@')) < 0.1
+
+
+def test_equity_counts_the_leave():
+    game = GameController([None, None], Bag())
+    player = AiPlayer(game, View(game), "AI Player 1", equity=True)
+    player.leave_table = None  # whether or not a table's been built, value leaves with leave_value()
+    player.rack.rack_tiles = list('AEIQRST')
+    moves = player.generate_all_moves()
+    equities = {str(move): move.score + leave_value(player.rack_leave(move)) for move in moves}
+    highest_score = max(move.score for move in moves)
+    best = player.best_move(moves)
+    assert equities[str(best)] == max(equities.values())
+    # keeping the Q costs more than it could score:
+    assert 'Q' not in player.rack
+    assert best.score < highest_score
@@ -1,4 +1,14 @@
-from model.lexicon import Lexicon
+import os
+import pickle
+
+import numpy as np
+import pytest
+
+from dawg import CompletionDAWG
+
+import model.lexicon as lexicon_module
+from model.lexicon import AnagramIndex, Gaddag, Lexicon, MemoizedLexicon, build_lexicon_file, get_lexicon, \
+    index_path, minimal_automaton, register_lexicon, shared_lexicon
 
 
 def test_init():
@@ -19,12 +29,17 @@ def test_starts_with():
 def test_contains_prefix():
     lex = Lexicon()
     assert lex.contains_prefix('catas')
+    assert lex.contains_prefix('zyzzyva')
+    assert not lex.contains_prefix('zyzzyvas')  # a word, but nothing longer starts with it
+    assert not lex.contains_prefix('qzx')
 
 
 def test_contains_word_or_prefix():
     lex = Lexicon()
     assert lex.contains_word_or_prefix('catas')
     assert lex.contains_word_or_prefix('blimp')
+    assert lex.contains_word_or_prefix('zyzzyvas')
+    assert not lex.contains_word_or_prefix('qzx')
 
 
 def test_list_words():
@@ -35,3 +50,213 @@ def test_list_words():
 def test_contains():
     lex = Lexicon()
     assert 'CAT' in lex
+
+
+def make_small_dawg(tmp_path, words):
+    path = str(tmp_path / 'small.dawg')
+    CompletionDAWG(sorted(words)).save(path)
+    return path
+
+
+def test_index_file_written_and_reused(tmp_path):
+    path = make_small_dawg(tmp_path, ['CAT', 'CATS', 'SCAT'])
+    lex = Lexicon(path)
+    assert os.path.exists(index_path(path))
+    assert lex.contains_infix('AT')
+
+    reloaded = Lexicon(path)
+    assert reloaded.load_indexes(index_path(path))
+    assert reloaded.words_containing('CA') == lex.words_containing('CA')
+
+
+def test_stale_index_file_rebuilt(tmp_path):
+    path = make_small_dawg(tmp_path, ['CAT', 'CATS'])
+    Lexicon(path)
+    path = make_small_dawg(tmp_path, ['DOG', 'DOGS'])
+    lex = Lexicon(path)
+    assert lex.words_containing('OG') == ['DOG', 'DOGS']
+
+
+def test_minimal_automaton():
+    sources, labels, targets = minimal_automaton(['AT@', 'CAT@', 'CUT@'])
+    edges = set(zip(sources, labels, targets))
+    assert len(edges) == len(sources)
+    # A and U lead on to the same state (as do the root's A and CA), so there are only 5 states, and 6 edges:
+    assert len(set(sources) | set(targets)) == 5
+    assert len(edges) == 6
+    assert sorted(label for source, label, target in edges if source == 0) == [1, 3]
+
+
+def test_gaddag_walks_both_directions():
+    gaddag = Gaddag.from_words(['CAT', 'CATS', 'SCAT'])
+    # grow leftwards from the 'A' of CAT, then cross over and grow rightwards:
+    node = gaddag.follow(Gaddag.ROOT, 'AC')
+    node = gaddag.child(node, Gaddag.SEPARATOR)
+    assert not gaddag.is_terminal(node)
+    assert gaddag.is_terminal(gaddag.follow(node, 'T'))
+    assert gaddag.is_terminal(gaddag.follow(node, 'TS'))
+    assert gaddag.follow(node, 'X') is None
+
+
+def test_gaddag_extensions():
+    gaddag = Gaddag.from_words(['CAT', 'CATS', 'SCAT'])
+    words = [left + right for left, right in gaddag.extensions(gaddag.anchor_node('CA'), 'CA')]
+    assert sorted(words) == ['CAT', 'CATS', 'SCAT']
+
+
+def test_gaddag_heights():
+    gaddag = Gaddag.from_words(['CAT', 'CATS', 'SCAT'])
+    heights = gaddag.heights()
+    assert heights[Gaddag.ROOT] == 4
+    # from the 'A' of CAT, leftwards to S then back out to the end of CATS:
+    assert heights[gaddag.follow(Gaddag.ROOT, 'A')] == 3
+    assert heights[gaddag.follow(Gaddag.ROOT, 'TACS')] == 0
+    assert heights[gaddag.child(gaddag.follow(Gaddag.ROOT, 'AC'), Gaddag.SEPARATOR)] == 2
+
+
+def test_contains_infix():
+    lex = Lexicon()
+    assert lex.contains_infix('atas')
+    assert not lex.contains_infix('qzx')
+    # a fragment ending every word it's in counts, which listing suffixes (needing two of them) used to miss:
+    assert lex.contains_infix('ABILITY')
+    assert lex.contains_infix('ZZYVA')
+    # but the fragment needs a letter in front of it, not just to be a word:
+    assert not lex.contains_infix('ZYZZYVA')
+
+
+def test_words_containing():
+    lex = Lexicon()
+    assert lex.words_containing('xyz') == ['HYDROXYZINE', 'HYDROXYZINES']
+
+
+def test_crosscheck_mask():
+    lex = Lexicon()
+    # C_T: CAT, CIT, COT, CUT...
+    mask = lex.crosscheck_mask('c', 't')
+    assert mask & (1 << 1) and mask & (1 << 15) and mask & (1 << 21)
+    assert not mask & (1 << 2)
+    # no four letter word ends in ZZY, and nothing goes between Q and Z:
+    assert lex.crosscheck_mask('', 'zzy') == 0
+    assert lex.crosscheck_mask('q', 'z') == 0
+    # every letter agrees with the word list:
+    mask = lex.crosscheck_mask('', 'at')
+    assert all(bool(mask & (1 << i)) == lex.contains(chr(64 + i) + 'AT') for i in range(1, 27))
+    mask = lex.crosscheck_mask('ca', '')
+    assert all(bool(mask & (1 << i)) == lex.contains('CA' + chr(64 + i)) for i in range(1, 27))
+
+
+def test_index_file_mapped_read_only():
+    lex = Lexicon()
+    assert not lex.gaddag.arrays[0].flags.writeable
+
+
+def test_pickles_as_path(tmp_path):
+    path = make_small_dawg(tmp_path, ['CAT', 'CATS', 'SCAT'])
+    lex = Lexicon(path)
+    data = pickle.dumps(lex)
+    assert len(data) < 1000
+    assert pickle.loads(data).words_containing('AT') == ['CAT', 'CATS', 'SCAT']
+
+
+def test_memoized_lexicon_counts_and_evicts(tmp_path):
+    path = make_small_dawg(tmp_path, ['CAT', 'CATS', 'SCAT'])
+    lex = MemoizedLexicon(Lexicon(path), max_size=2)
+    assert 'cat' in lex
+    assert lex.contains('CAT')
+    assert lex.contains_prefix('ca')
+    assert not lex.contains_infix('xa')  # evicts the answer for 'CAT'
+    assert lex.contains('cat')
+    stats = lex.stats()
+    assert (stats['hits'], stats['misses'], stats['evictions'], stats['size']) == (1, 4, 2, 2)
+    # anything else is passed through:
+    assert lex.words_containing('AT') == ['CAT', 'CATS', 'SCAT']
+    lex.clear()
+    assert lex.stats()['size'] == 0
+
+
+def test_anagram_index():
+    index = AnagramIndex.from_words(['CAT', 'ACT', 'CATS', 'SCAT', 'TA', 'DOG'])
+    assert index.words_for(b'ACT') == ['ACT', 'CAT']
+    assert index.anagrams('TACS') == ['ACT', 'CAT', 'CATS', 'SCAT', 'TA']
+    assert index.anagrams('TACS', use_all=True) == ['CATS', 'SCAT']
+    assert index.anagrams('DO@') == ['DOG']
+    assert index.anagrams('@?') == ['TA']
+    with pytest.raises(ValueError):
+        index.anagrams('@@@')
+
+
+def test_shortest_holding():
+    index = AnagramIndex.from_words(['CAT', 'ACT', 'CATS', 'SCAT', 'TA', 'DOG'])
+    assert index.shortest_holding('AT') == 2
+    assert index.shortest_holding('TS') == 4
+    assert index.shortest_holding('SS') is None
+    assert index.shortest_holding('DOG@') is None
+    assert index.shortest_holding('CS@') == 4
+    assert index.shortest_holding('CX@') is None
+
+
+def test_anagrams():
+    lex = Lexicon()
+    assert 'RETAINS' in lex.anagrams('aeinrst', use_all=True)
+    assert all(len(word) == 7 for word in lex.anagrams('SATIRE@', use_all=True))
+    assert 'QI' in lex.anagrams('QI@')
+
+
+def test_lexicon_file_round_trip(tmp_path):
+    path = str(tmp_path / 'small.lex')
+    Lexicon.from_words(['cat', 'CATS', 'SCAT']).save(path)
+    lex = Lexicon(path)
+    assert lex.list_words() == ['CAT', 'CATS', 'SCAT']
+    assert lex.contains_infix('AT')
+    assert lex.anagrams('STAC', use_all=True) == ['CATS', 'SCAT']
+    assert pickle.loads(pickle.dumps(lex)).path == path
+
+
+def test_build_lexicon_file_from_word_list(tmp_path):
+    text_path = tmp_path / 'words.txt'
+    text_path.write_text('# a word list\ncat a small animal\n\ndog\n')
+    lex = Lexicon(build_lexicon_file(str(text_path)))
+    assert lex.path == str(tmp_path / 'words.lex')
+    assert lex.list_words() == ['CAT', 'DOG']
+
+    text_path.write_text('cat\ndo-g\n')
+    with pytest.raises(ValueError):
+        build_lexicon_file(str(text_path))
+
+
+def test_get_lexicon(tmp_path, monkeypatch):
+    # registered (and loaded) for this test only, as the file goes with tmp_path:
+    monkeypatch.setattr(lexicon_module, 'registered_lexicons', dict(lexicon_module.registered_lexicons))
+    monkeypatch.setattr(lexicon_module, 'shared_lexicons', dict(lexicon_module.shared_lexicons))
+    path = str(tmp_path / 'small.lex')
+    Lexicon.from_words(['CAT']).save(path)
+    register_lexicon('Small', path)
+    assert get_lexicon('SMALL') is get_lexicon('small')
+    assert get_lexicon('small').list_words() == ['CAT']
+    assert get_lexicon() is shared_lexicon()
+    with pytest.raises(ValueError):
+        get_lexicon('nonexistent')
+
+
+def test_contains_all():
+    lex = Lexicon()
+    assert list(lex.contains_all(['cat', 'CATS', 'xq', '', 'QI'])) == [True, True, False, False, True]
+    # integer encoded, with a blank 'a' and zero padding:
+    words = np.zeros((3, 15), dtype='int8')
+    words[0, :3] = [3, 1, 20]
+    words[1, :3] = [3, 33, 20]
+    words[2, :2] = [17, 26]
+    assert list(lex.contains_all(words)) == [True, True, False]
+    assert list(lex.contains_all([[17, 9]])) == [True]
+    assert len(lex.contains_all([])) == 0
+
+
+def test_spell_words():
+    lex = Lexicon()
+
+    def ordinals(tiles):
+        return sorted(0 if tile == '@' else ord(tile) - 64 for tile in tiles)
+
+    racks = np.array([ordinals(tiles) for tiles in ('ACTIONS', 'ACTIONX', '@CTIONS', '@@TIONS', 'QZXJKVW')])
+    assert list(lex.anagram_index.spell_words(racks)) == [True, False, True, True, False]
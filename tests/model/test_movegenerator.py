@@ -0,0 +1,219 @@
+from copy import deepcopy
+
+import numpy as np
+
+from controller.game import GameController
+from model.aiplayer import AiPlayer, MoveGeneration
+from model.bag import Bag
+from model.config import Direction, PRE_ENDGAME_CANDIDATES
+from model.move import Move
+from model.movegenerator import MoveCache, MoveGenerator, ParallelMoveGenerator
+from view.view import View
+
+
+def setup(rack_tiles):
+    game = GameController([None, None], Bag())
+    player = AiPlayer(game, View(game), "AI Player 1")
+    player.rack.rack_tiles = list(rack_tiles)
+    game.players = [player, AiPlayer(game, View(game), "AI Player 2")]
+    move = Move(game.board.get_row(8, Direction.HORIZONTAL), 7, list('CAT'))
+    game.validator.is_valid(move)
+    game.validator.update_affected_squares(move)
+    return game, player
+
+
+def test_moves_match_recursive_search():
+    game, player = setup('ERSOUTA')
+    player.generation = MoveGeneration.RECURSIVE
+    expected = set(map(str, player.generate_all_moves()))
+    player.generation = MoveGeneration.ANCHOR
+    moves = player.generate_all_moves()
+    assert set(map(str, moves)) == expected
+    assert len(moves) == len(expected)
+
+
+def test_blanks_tried_as_every_letter():
+    game, player = setup('ERSOUT@')
+    player.generation = MoveGeneration.RECURSIVE
+    # the recursive search only tries the letter the blank is assigned up front:
+    assigned = set(str(move) for move in player.generate_all_moves() if move.row)
+    player.rack.reset_blanks()
+    player.generation = MoveGeneration.ANCHOR
+    moves = [move for move in player.generate_all_moves() if move.row]
+    assert assigned < set(map(str, moves))
+    # a blank as each of several letters, and in place of a tile held for the same letter:
+    assert len(set(tile for move in moves for tile in move.tiles if tile.islower())) > 20
+    assert any(set(move.tiles) == set('ERSOUTe') for move in moves)
+    for move in moves:
+        word = move.row.word_with_tiles(move.played_squares, [tile.upper() for tile in move.tiles])
+        assert word in game.lexicon
+
+
+def test_recursive_search_restores_board_and_rack():
+    game, player = setup('ERSOUTA')
+    player.generation = MoveGeneration.RECURSIVE
+    board = {name: getattr(game.board, name).copy() for name in game.board.ARRAYS}
+    moves = player.generate_all_moves()
+    assert player.rack.rack_tiles == list('ERSOUTA')
+    for name in game.board.ARRAYS:
+        assert (getattr(game.board, name) == board[name]).all()
+    # moves refer to the board itself rather than a copy of it:
+    assert all(np.shares_memory(move.row.existing_letters, game.board.existing_letters) for move in moves if move.row)
+
+
+def test_scores_match_move_scoring():
+    game, player = setup('QUIZeRS')
+    generator = MoveGenerator(game.lexicon)
+    row = game.board.get_row(9, Direction.HORIZONTAL)
+    moves = generator.moves_for_row(row, player.rack.rack_tiles)
+    # including blanks swapped with real tiles for the same letter:
+    moves += generator.moves_for_row(row, list('EERS@'))
+    assert moves
+    for move in moves:
+        row_copy = deepcopy(row)
+        scored = Move(row_copy, move.start_index, move.tiles)
+        assert list(scored.played_squares) == list(move.played_squares)
+        row_copy.place_tiles(move.played_squares, move.tiles)
+        scored.calculate_score()
+        assert scored.score == move.score
+        assert row_copy.word_at(move.start_index) in game.lexicon
+
+
+def test_row_left_unchanged():
+    game, player = setup('ERSOUTe')
+    row = game.board.get_row(7, Direction.HORIZONTAL)
+    letters = row.existing_letters.copy()
+    MoveGenerator(game.lexicon).moves_for_row(row, player.rack.rack_tiles)
+    assert (row.existing_letters == letters).all()
+
+
+def test_iter_moves_streams_each_move_once():
+    game, player = setup('ERSOUTe')
+    generator = MoveGenerator(game.lexicon)
+    rows = game.board.hooked_rows()
+    moves = generator.iter_moves(rows, player.rack.rack_tiles)
+    assert str(next(moves)) == str(generator.moves_for_row(rows[0], player.rack.rack_tiles)[0])
+
+    moves = [str(move) for move in generator.iter_moves(rows, player.rack.rack_tiles)]
+    assert moves == [str(move) for row in rows for move in generator.moves_for_row(row, player.rack.rack_tiles)]
+    assert len(set(moves)) == len(moves)
+
+    for generation in (MoveGeneration.ANCHOR, MoveGeneration.RECURSIVE):
+        player.generation = generation
+        moves = [str(move) for move in player.iter_moves()]
+        assert len(set(moves)) == len(moves)
+        assert moves[-1] == 'Move: pass'
+
+
+def test_best_moves_match_full_search():
+    game, player = setup('ERSOUTe')
+    generator = MoveGenerator(game.lexicon)
+    rows = game.board.hooked_rows()
+    for rack_tiles in (list('ERSOUTA'), list('ERSOUT@'), list('DGLNOTU'), list('QI')):
+        scores = sorted([move.score for row in rows for move in generator.moves_for_row(row, rack_tiles)],
+                        reverse=True)
+        for k in (1, 10):
+            moves = generator.best_moves(rows, rack_tiles, k)
+            assert [move.score for move in moves] == scores[:k]
+
+
+def test_search_stops_when_asked():
+    game, player = setup('ERSOUTA')
+    generator = MoveGenerator(game.lexicon)
+    rows = game.board.hooked_rows()
+    best = generator.best_moves(rows, player.rack.rack_tiles, 1)[0].score
+    checks = []
+
+    def stop():
+        checks.append(None)
+        return len(checks) > 50
+
+    moves = generator.best_moves(rows, player.rack.rack_tiles, 1, stop)
+    assert len(checks) == 51
+    assert len(moves) <= 1 and all(move.score <= best for move in moves)
+
+    # with no time at all, no placement is found, so the player exchanges or passes:
+    player.time_budget = 0
+    assert player.get_move().row is None
+
+    player.time_budget = 60
+    player.start_clock()
+    assert not player.out_of_time()
+    # without top_k, a few of the best placements are found, for equity or the pre-endgame to choose between:
+    assert len(list(player.iter_placements(rows))) == PRE_ENDGAME_CANDIDATES
+    game.active_player = player
+    game.cancel_move()
+    assert player.out_of_time()
+    player.start_clock()
+    assert not player.out_of_time()
+
+
+def test_opening_move_against_the_clock_finds_several_placements(monkeypatch):
+    game = GameController([None, None], Bag())
+    player = AiPlayer(game, View(game), "AI Player 1", time_budget=60)
+    player.rack.rack_tiles = list('ERSOUTA')
+    candidates = []
+    monkeypatch.setattr(player, 'best_move', lambda moves: candidates.extend(moves) or moves[0])
+    player.get_starting_move()
+    assert len(candidates) == PRE_ENDGAME_CANDIDATES
+
+
+def test_parallel_moves_match_serial():
+    game, player = setup('ERSOUTe')
+    generator = MoveGenerator(game.lexicon)
+
+    def rows_and_moves():
+        rows = game.board.hooked_rows()
+        return rows, [(str(move), move.score) for row in rows
+                      for move in generator.moves_for_row(row, player.rack.rack_tiles)]
+
+    with ParallelMoveGenerator(game.lexicon, game.board, processes=2) as parallel:
+        rows, expected = rows_and_moves()
+        moves = parallel.moves_for_rows(rows, player.rack.rack_tiles)
+        assert [(str(move), move.score) for move in moves] == expected
+        assert all(np.shares_memory(move.row.existing_letters, game.board.existing_letters) for move in moves)
+
+        # the workers see the board as it is now, not as it was when they started:
+        move = Move(game.board.get_row(7, Direction.VERTICAL), 9, list('OX'))
+        game.validator.is_valid(move)
+        game.validator.update_affected_squares(move)
+        rows, expected = rows_and_moves()
+        moves = parallel.moves_for_rows(rows, player.rack.rack_tiles)
+        assert [(str(move), move.score) for move in moves] == expected
+
+
+def test_move_cache_searches_only_changed_lines():
+    game, player = setup('ERSOUTA')
+    generator = MoveGenerator(game.lexicon)
+    searched = []
+
+    def generate(rows, rack_tiles):
+        searched.extend((row.direction.value, row.rank) for row in rows)
+        return [move for row in rows for move in generator.moves_for_row(row, rack_tiles)]
+
+    def rows():
+        return [game.board.get_row(rank, direction) for direction in (Direction.HORIZONTAL, Direction.VERTICAL)
+                for rank in range(1, 16)]
+
+    cache = MoveCache(game.board, 256)
+    moves = cache.moves_for_rows(rows(), player.rack.rack_tiles, generate)
+    assert len(searched) == 30
+    assert cache.moves_for_rows(rows(), player.rack.rack_tiles, generate) == moves
+    assert len(searched) == 30
+
+    # a different rack means searching again:
+    cache.moves_for_rows(rows(), list('QUIZeRS'), generate)
+    assert len(searched) == 60
+
+    # playing COX down from the C of CAT only changes the lines around it:
+    del searched[:]
+    move = Move(game.board.get_row(7, Direction.VERTICAL), 9, list('OX'))
+    game.validator.is_valid(move)
+    game.validator.update_affected_squares(move)
+    moves = cache.moves_for_rows(rows(), player.rack.rack_tiles, generate)
+    assert (Direction.VERTICAL.value, 7) in searched
+    assert (Direction.HORIZONTAL.value, 11) in searched
+    assert (Direction.HORIZONTAL.value, 3) not in searched
+    assert (Direction.VERTICAL.value, 14) not in searched
+    assert [str(move) for move in moves] == [str(move) for row in rows()
+                                              for move in generator.moves_for_row(row, player.rack.rack_tiles)]
@@ -1,5 +1,10 @@
+import pytest
+
+from controller.game import GameController
 from model.bag import Bag
+from model.config import Direction
 from model.move import Move
+from model.movevalidator import MoveValidationError
 from model.config import LETTER_DISTRIBUTIONS
 import copy
 
@@ -16,3 +21,19 @@ def crosswords_valid(row):
 def valid_hook(row, played_squares):
     pass
 
+
+
+def test_words_formed():
+    game = GameController([None, None], Bag())
+    validator, board = game.validator, game.board
+    move = Move(board.get_row(8, Direction.HORIZONTAL), 7, list('CAT'))
+    assert validator.is_valid(move)
+    validator.update_affected_squares(move)
+    assert validator.words_formed(move) == ['CAT']
+
+    # ZA under CA forms two cross-words, and CZ isn't a word:
+    move = Move(board.get_row(9, Direction.HORIZONTAL), 7, ['Z', 'A'])
+    assert validator.words_formed(move) == ['ZA', 'CZ', 'AA']
+    with pytest.raises(MoveValidationError):
+        validator.is_valid(move)
+    assert not board.existing_letters[9, 7]
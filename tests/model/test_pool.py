@@ -0,0 +1,25 @@
+from model.pool import WorkerPool, deal_out
+
+offsets = {}
+
+
+def start_offset_worker(offset):
+    offsets['offset'] = offset
+
+
+def add_offset(batch, scale):
+    return [offsets['offset'] + scale * item for item in batch]
+
+
+def test_deal_out():
+    assert deal_out(list(range(7)), 3) == [[0, 3, 6], [1, 4], [2, 5]]
+    assert deal_out([1], 3) == [[1]]
+    assert deal_out([], 2) == []
+
+
+def test_worker_pool():
+    cleaned_up = []
+    with WorkerPool(2, start_offset_worker, (100,), lambda: cleaned_up.append(True)) as pool:
+        results = pool.map(add_offset, list(range(5)), 2)
+    assert results == [[100, 104, 108], [102, 106]]
+    assert cleaned_up == [True]
@@ -0,0 +1,44 @@
+from math import comb
+
+from controller.game import GameController
+from model.aiplayer import AiPlayer
+from model.bag import Bag
+from model.config import Direction
+from model.move import Move
+from model.preendgame import PreEndgame, draws
+from view.view import View
+
+
+def test_draws():
+    drawn = list(draws('AABC', 2))
+    assert sorted(tiles for tiles, ways in drawn) == [('A', 'A'), ('A', 'B'), ('A', 'C'), ('B', 'C')]
+    assert dict(drawn)[('A', 'B')] == 2
+    assert sum(ways for tiles, ways in drawn) == comb(4, 2)
+    assert list(draws('AB', 0)) == [((), 1)]
+
+
+def test_pre_endgame(monkeypatch):
+    game = GameController([None, None], Bag())
+    move = Move(game.board.get_row(8, Direction.HORIZONTAL), 7, list('CAT'))
+    game.validator.is_valid(move)
+    game.validator.update_affected_squares(move)
+    player = AiPlayer(game, View(game), "AI Player 1")
+    player.rack.rack_tiles = list('SQ')
+    moves = player.generate_all_moves()
+    letters = game.board.existing_letters.copy()
+
+    # a tile in the bag, and two on the opponent's rack:
+    unseen = ['X', 'Z', 'E']
+    monkeypatch.setattr('model.preendgame.unseen_tiles', lambda board, rack_tiles: unseen)
+    with PreEndgame(game.lexicon, 1) as pre_endgame:
+        results = pre_endgame.evaluate(game.board, player.rack.rack_tiles, 1, moves, 0, 30)
+    assert pre_endgame.scenarios == pre_endgame.evaluated == 3
+    assert (game.board.existing_letters == letters).all()
+    assert all(0 <= win <= 1 for win, lead in results)
+    assert len(results) == len(moves)
+    # the opponent has the big tiles, and gets to use them whatever's played:
+    assert all(lead < 0 for win, lead in results)
+
+    # shared out between worker processes, the deals come to exactly the same:
+    with PreEndgame(game.lexicon, 2) as pre_endgame:
+        assert pre_endgame.evaluate(game.board, player.rack.rack_tiles, 1, moves, 0, 30) == results
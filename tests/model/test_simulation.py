@@ -0,0 +1,44 @@
+from controller.game import GameController
+from model.bag import Bag
+from model.config import Direction
+from model.move import Move
+from model.simaiplayer import SimAiPlayer
+from model.simulation import Simulator, unseen_tiles
+from view.view import View
+
+
+def setup(rack_tiles):
+    game = GameController([None, None], Bag())
+    player = SimAiPlayer(game, View(game), "AI Player 1", candidates=3, iterations=2, plies=2)
+    player.rack.rack_tiles = list(rack_tiles)
+    game.players = [player, SimAiPlayer(game, View(game), "AI Player 2")]
+    move = Move(game.board.get_row(8, Direction.HORIZONTAL), 7, list('CAT'))
+    game.validator.is_valid(move)
+    game.validator.update_affected_squares(move)
+    return game, player
+
+
+def test_unseen_tiles():
+    game, player = setup('ERSOUT@')
+    unseen = unseen_tiles(game.board, player.rack.rack_tiles)
+    assert len(unseen) == 100 - 3 - 7
+    assert unseen.count('@') == 1
+    assert unseen.count('C') == 1
+
+
+def test_simulation_reproducible_across_processes():
+    game, player = setup('ERSOUTA')
+    moves = player.generate_all_moves()
+    moves.sort(key=player.move_equity, reverse=True)
+    candidates = moves[:3]
+    letters = game.board.existing_letters.copy()
+
+    results = player.simulator.evaluate(game.board, player.rack.rack_tiles, candidates, 3, 2, seed=7)
+    assert (game.board.existing_letters == letters).all()
+    assert player.simulator.iterations == 3
+    with Simulator(game.lexicon, processes=2) as simulator:
+        assert simulator.evaluate(game.board, player.rack.rack_tiles, candidates, 3, 2, seed=7) == results
+    assert player.simulator.evaluate(game.board, player.rack.rack_tiles, candidates, 3, 2, seed=8) != results
+
+    best = player.best_move(moves)
+    assert str(best) in [str(move) for move in candidates]
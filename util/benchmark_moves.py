@@ -0,0 +1,63 @@
+import argparse
+import contextlib
+import io
+import random
+import time
+
+from controller.game import GameController
+from model.aiplayer import AiPlayer
+from model.bag import Bag
+from view.view import View
+
+
+class TimingPlayer(AiPlayer):
+    """ an AI player which, before each of its moves, times generating all the moves
+    on the board for each of a list of racks """
+
+    def __init__(self, game, gui, name, racks, timings):
+        super().__init__(game, gui, name)
+        self.racks = racks
+        self.timings = timings
+
+    def generate_all_moves(self):
+        rows = self.board.hooked_rows()
+        for rack in self.racks:
+            start = time.perf_counter()
+            moves = [move for row in rows for move in self.move_generator.moves_for_row(row, list(rack))]
+            self.timings[rack].append((time.perf_counter() - start, len(moves)))
+        return super().generate_all_moves()
+
+
+def main(args=None):
+    """ Times move generation.
+    Usage: python -m util.benchmark_moves [--racks AEINRST AEINRS@ AEINR@@] [--games 3] [--seed 1]
+    plays AI games, and at each of their positions times generating every move on the board
+    for each of the given racks (blanks as '@'), then reports the time taken per rack """
+
+    parser = argparse.ArgumentParser(description='Time move generation.')
+    parser.add_argument('--racks', nargs='+', default=['AEINRST', 'AEINRS@', 'AEINR@@'],
+                        help="racks to time, with '@' for a blank (default: AEINRST AEINRS@ AEINR@@)")
+    parser.add_argument('--games', type=int, default=3, help='number of games to play (default: 3)')
+    parser.add_argument('--seed', type=int, default=1, help='random seed for the first game (default: 1)')
+    args = parser.parse_args(args)
+
+    timings = {rack: [] for rack in args.racks}
+    for seed in range(args.seed, args.seed + args.games):
+        random.seed(seed)
+        game = GameController([None, None], Bag())
+        gui = View(game)
+        game.players = [TimingPlayer(game, gui, "AI Player " + str(i + 1), args.racks, timings) for i in range(2)]
+        # the game reports every move as it goes:
+        with contextlib.redirect_stdout(io.StringIO()):
+            game.start_game()
+
+    print("rack      positions   mean ms    max ms   mean moves")
+    for rack, results in timings.items():
+        seconds = [result[0] for result in results]
+        moves = [result[1] for result in results]
+        print("{:<9} {:>9} {:>9.1f} {:>9.1f} {:>12.0f}".format(
+            rack, len(results), 1000 * sum(seconds) / len(seconds), 1000 * max(seconds), sum(moves) / len(moves)))
+
+
+if __name__ == "__main__":
+    main()
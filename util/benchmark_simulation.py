@@ -0,0 +1,52 @@
+import argparse
+import contextlib
+import io
+import os
+import random
+
+from controller.game import GameController
+from model.bag import Bag
+from model.simaiplayer import SimAiPlayer
+from view.view import View
+
+
+def main(args=None):
+    """ Times simulation.
+    Usage: python -m util.benchmark_simulation [--games 1] [--candidates 10] [--iterations 20] [--plies 3]
+    [--processes N] [--seed 1]
+    plays games between simulating AI players, then reports how many iterations (every candidate
+    played out against one opponent's rack) they ran per second, overall and per process """
+
+    parser = argparse.ArgumentParser(description='Time simulation.')
+    parser.add_argument('--games', type=int, default=1, help='number of games to play (default: 1)')
+    parser.add_argument('--candidates', type=int, default=10, help='moves simulated each turn (default: 10)')
+    parser.add_argument('--iterations', type=int, default=20, help='iterations each turn (default: 20)')
+    parser.add_argument('--plies', type=int, default=3, help='moves played out, counting the candidate (default: 3)')
+    parser.add_argument('--processes', type=int, default=os.cpu_count(),
+                        help='number of processes per player (default: one per CPU)')
+    parser.add_argument('--seed', type=int, default=1, help='random seed for the first game (default: 1)')
+    args = parser.parse_args(args)
+
+    iterations = seconds = 0
+    for seed in range(args.seed, args.seed + args.games):
+        random.seed(seed)
+        game = GameController([None, None], Bag())
+        gui = View(game)
+        game.players = [SimAiPlayer(game, gui, "AI Player " + str(i + 1), args.candidates, args.iterations,
+                                    args.plies, args.processes, seed) for i in range(2)]
+        # the game reports every move as it goes:
+        with contextlib.redirect_stdout(io.StringIO()):
+            game.start_game()
+        for player in game.players:
+            iterations += player.simulator.iterations
+            seconds += player.simulator.seconds
+            player.simulator.close()
+
+    rate = iterations / seconds if seconds else 0.0
+    print("processes   iterations   seconds   iterations/s   per process   candidate plays/s per process")
+    print("{:>9} {:>12} {:>9.1f} {:>14.2f} {:>13.2f} {:>31.2f}".format(
+        args.processes, iterations, seconds, rate, rate / args.processes, rate * args.candidates / args.processes))
+
+
+if __name__ == "__main__":
+    main()
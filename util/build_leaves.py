@@ -0,0 +1,101 @@
+import argparse
+import contextlib
+import io
+import os
+import random
+import time
+
+import numpy as np
+
+from controller.game import GameController
+from model.aiplayer import AiPlayer
+from model.bag import Bag
+from model.config import RACK_SIZE
+from model.leave import DEFAULT_LEAVE_FILE, LeaveTable, leave_index
+from model.lexicon import ROOT_DIR
+from model.pool import WorkerPool
+from view.view import View
+
+
+class RecordingPlayer(AiPlayer):
+    """ an AI player choosing moves by equity, which notes the tiles it keeps after each move,
+    and what its next move scores """
+
+    def __init__(self, game, gui, name, leave_table, observations):
+        super().__init__(game, gui, name, equity=True)
+        self.leave_table = leave_table
+        self.observations = observations
+        self.last_leave = None
+
+    def best_move(self, potential_moves):
+        move = super().best_move(potential_moves)
+        if self.last_leave is not None:
+            self.observations.append((self.last_leave, move.score))
+        # the tiles left on the rack, which are only worth learning from if the bag will fill the rack back up:
+        leave = leave_index(self.rack.rack_tiles)
+        self.last_leave = leave if self.game.bag.remaining_tiles() >= RACK_SIZE - len(self.rack.rack_tiles) \
+            else None
+        return move
+
+
+def play_games(seeds, table_path: str = None):
+    """ plays a self-play game for each of the argument random seeds
+    :return: list of (leave number, score of the move after it) pairs """
+    leave_table = LeaveTable.load(table_path) if table_path else LeaveTable.from_leave_values()
+    observations = []
+    for seed in seeds:
+        random.seed(seed)
+        game = GameController([None, None], Bag())
+        gui = View(game)
+        game.players = [RecordingPlayer(game, gui, "AI Player " + str(i + 1), leave_table, observations)
+                        for i in range(2)]
+        # the game reports every move as it goes:
+        with contextlib.redirect_stdout(io.StringIO()):
+            game.start_game()
+    return observations
+
+
+def main(args=None):
+    """ Builds the leave table AI players value their rack leaves with.
+    Usage: python -m util.build_leaves [--games 1000] [--seed 1] [--processes N] [--start leaves.npy]
+    [--prior-weight 20] [-o leaves.npy]
+    plays AI games against each other, choosing moves by equity, and notes each leave kept (while the
+    bag can refill the rack) with the score of the next move made from it. A leave is worth how much more
+    than average its next moves score, with leaves seen only a few times (or never) pulled towards their
+    worth in the starting table, which is leave_value()'s unless another table is given to improve on """
+
+    parser = argparse.ArgumentParser(description='Build a leave table by self-play.')
+    parser.add_argument('--games', type=int, default=1000, help='number of games to play (default: 1000)')
+    parser.add_argument('--seed', type=int, default=1, help='random seed for the first game (default: 1)')
+    parser.add_argument('--processes', type=int, default=os.cpu_count(),
+                        help='number of processes to play games in (default: one per CPU)')
+    parser.add_argument('--start', help='leave table to play with and improve on (default: leave_value())')
+    parser.add_argument('--prior-weight', type=float, default=20,
+                        help="how many sightings of a leave its starting worth counts for (default: 20)")
+    parser.add_argument('-o', '--output', default=os.path.join(ROOT_DIR, DEFAULT_LEAVE_FILE),
+                        help='where to write the leave table (default: leaves.npy)')
+    args = parser.parse_args(args)
+
+    start = time.time()
+    seeds = list(range(args.seed, args.seed + args.games))
+    # the games are dealt out between the processes, so each gets its share:
+    with WorkerPool(min(args.processes, len(seeds))) as pool:
+        results = pool.map(play_games, seeds, args.start)
+    leaves = np.array([leave for observations in results for leave, score in observations], dtype='int64')
+    scores = np.array([score for observations in results for leave, score in observations], dtype='float64')
+
+    table = LeaveTable.load(args.start) if args.start else LeaveTable.from_leave_values()
+    prior = np.asarray(table.values, dtype='float64')
+    sightings = np.bincount(leaves, minlength=len(prior))
+    # how much more than average the moves after each leave scored, in total:
+    surplus = np.bincount(leaves, weights=scores - scores.mean(), minlength=len(prior))
+    LeaveTable((surplus + args.prior_weight * prior) / (sightings + args.prior_weight)).save(args.output)
+
+    print("Played " + str(args.games) + " games (" + str(len(scores)) + " leaves, "
+          + str(np.count_nonzero(sightings)) + " distinct, mean next move " + str(round(scores.mean(), 1))
+          + ") in " + str(round(time.time() - start, 2)) + "s")
+    print("Wrote " + args.output)
+
+
+if __name__ == "__main__":
+    main()
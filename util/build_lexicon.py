@@ -0,0 +1,32 @@
+import argparse
+import os
+import time
+
+from model.lexicon import build_index_file, build_lexicon_file, ROOT_DIR, DEFAULT_LEXICON_FILE
+
+
+def main(args=None):
+    """ Builds lexicon files.
+    Usage: python -m util.build_lexicon [path/to/words.dawg]
+    rebuilds the index file for a DAWG of a word list (csw.dawg by default), and
+    python -m util.build_lexicon path/to/words.txt [-o path/to/words.lex]
+    builds a lexicon file, holding the word list and its indexes, from a plain word list """
+
+    parser = argparse.ArgumentParser(description='Build lexicon files.')
+    parser.add_argument('source', nargs='?', default=os.path.join(ROOT_DIR, DEFAULT_LEXICON_FILE),
+                        help='a DAWG of a word list to (re)build the index file for (default: csw.dawg), '
+                             'or a plain text word list, one word per line, to build a lexicon file from')
+    parser.add_argument('-o', '--output', help='where to write the lexicon file built from a plain word list '
+                                               '(default: alongside it, with a .lex extension)')
+    args = parser.parse_args(args)
+
+    start = time.time()
+    if os.path.splitext(args.source)[1] == '.dawg':
+        path = build_index_file(args.source)
+    else:
+        path = build_lexicon_file(args.source, args.output)
+    print("Wrote " + path + " in " + str(round(time.time() - start, 2)) + "s")
+
+
+if __name__ == "__main__":
+    main()